@@ -1,16 +1,19 @@
 'use client';
 
-import { useEffect } from 'react';
+import { useEffect, useRef } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import BoardView from '@/components/BoardView';
 import { useBoardStore } from '@/store/boardStore';
-import { getBoard, getLabels, getUsers } from '@/lib/api';
+import { boardVersion, getBoard, getBoardChanges, getLabels, getUsers } from '@/lib/api';
+import { subscribeToBoard } from '@/lib/events';
 
 export default function BoardPage() {
   const params = useParams();
   const router = useRouter();
   const boardId = params.id as string;
-  const { setBoard, setLists, setLabels, setUsers, setLoading } = useBoardStore();
+  const { setBoard, setLists, setLabels, setUsers, setLoading, applyBoardDelta } = useBoardStore();
+  // Board version the store reflects, so refreshes only fetch what changed since
+  const versionRef = useRef<number | undefined>();
 
   useEffect(() => {
     if (boardId === 'new') {
@@ -20,6 +23,41 @@ export default function BoardPage() {
     fetchBoardData();
   }, [boardId]);
 
+  // Pick up collaborators' edits as they happen instead of re-polling
+  useEffect(() => {
+    if (boardId === 'new') return;
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = subscribeToBoard(boardId, () => {
+      // Coalesce bursts of events into one quiet refresh
+      clearTimeout(timer);
+      timer = setTimeout(refreshBoard, 200);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, [boardId]);
+
+  const refreshBoard = async () => {
+    try {
+      if (versionRef.current !== undefined) {
+        const { data: delta } = await getBoardChanges(boardId, versionRef.current);
+        if (!delta.resync) {
+          applyBoardDelta(delta);
+          versionRef.current = delta.version;
+          return;
+        }
+      }
+      const [boardResponse, labelsResponse] = await Promise.all([getBoard(boardId), getLabels(boardId)]);
+      versionRef.current = boardVersion(boardResponse.headers['etag']);
+      setBoard(boardResponse.data);
+      setLists(boardResponse.data.lists || []);
+      setLabels(labelsResponse.data);
+    } catch (error) {
+      console.error('Error refreshing board:', error);
+    }
+  };
+
   const fetchBoardData = async () => {
     try {
       setLoading(true);
@@ -29,6 +67,7 @@ export default function BoardPage() {
         getUsers(),
       ]);
 
+      versionRef.current = boardVersion(boardResponse.headers['etag']);
       setBoard(boardResponse.data);
       setLists(boardResponse.data.lists || []);
       setLabels(labelsResponse.data);
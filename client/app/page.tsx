@@ -2,12 +2,12 @@
 
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
-import { getBoards } from '@/lib/api';
-import type { Board } from '@/types';
+import { getBoardSummaries } from '@/lib/api';
+import type { BoardSummary } from '@/types';
 
 export default function Home() {
   const router = useRouter();
-  const [boards, setBoards] = useState<Board[]>([]);
+  const [boards, setBoards] = useState<BoardSummary[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -16,7 +16,7 @@ export default function Home() {
 
   const fetchBoards = async () => {
     try {
-      const response = await getBoards();
+      const response = await getBoardSummaries();
       setBoards(response.data);
     } catch (error) {
       console.error('Error fetching boards:', error);
@@ -45,7 +45,7 @@ export default function Home() {
       <div className="max-w-7xl mx-auto">
         <h1 className="text-2xl md:text-3xl font-bold mb-6 md:mb-8 text-gray-800 animate-slideIn">My Boards</h1>
         <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-3 md:gap-4">
-          {boards.map((board: Board, index: number) => (
+          {boards.map((board: BoardSummary, index: number) => (
             <div
               key={board.id}
               onClick={() => handleBoardClick(board.id)}
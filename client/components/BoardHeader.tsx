@@ -4,13 +4,15 @@ import { useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { FiMenu, FiStar, FiMoreVertical, FiUsers } from 'react-icons/fi';
 import { useBoardStore } from '@/store/boardStore';
-import { updateBoard, deleteBoard } from '@/lib/api';
+import { updateBoard, deleteBoard, getArchivedCards, restoreCard } from '@/lib/api';
+import { ArchivedCard } from '@/types';
 
 export default function BoardHeader() {
   const router = useRouter();
-  const { board, setBoard } = useBoardStore();
+  const { board, lists, setBoard, addCard } = useBoardStore();
   const [showMenu, setShowMenu] = useState(false);
   const [showBackgroundMenu, setShowBackgroundMenu] = useState(false);
+  const [archivedCards, setArchivedCards] = useState<ArchivedCard[] | null>(null);
 
   if (!board) return null;
 
@@ -36,6 +38,30 @@ export default function BoardHeader() {
     }
   };
 
+  const handleShowArchive = async () => {
+    setShowMenu(false);
+    try {
+      const response = await getArchivedCards(board.id);
+      setArchivedCards(response.data);
+    } catch (error) {
+      console.error('Error loading archived cards:', error);
+    }
+  };
+
+  const handleRestoreCard = async (archived: ArchivedCard) => {
+    try {
+      const response = await restoreCard(archived.id).catch((error) => {
+        // Its list was deleted since; put it back in the first list instead
+        if (error.response?.status === 409 && lists[0]) return restoreCard(archived.id, { listId: lists[0].id });
+        throw error;
+      });
+      addCard(response.data);
+      setArchivedCards((cards) => cards?.filter((card) => card.id !== archived.id) ?? null);
+    } catch (error) {
+      console.error('Error restoring card:', error);
+    }
+  };
+
   const handleDeleteBoard = async () => {
     if (confirm('Are you sure you want to delete this board?')) {
       try {
@@ -109,15 +135,46 @@ export default function BoardHeader() {
                 onClick={() => setShowMenu(false)}
               />
               <div className="absolute top-full right-0 mt-2 bg-white rounded-lg shadow-xl z-20 min-w-[200px] animate-scaleIn">
+                <button
+                  onClick={handleShowArchive}
+                  className="w-full text-left px-4 py-2 text-gray-700 hover:bg-gray-100 rounded-t-lg transition-all duration-200 hover:scale-105"
+                >
+                  Archived Cards
+                </button>
                 <button
                   onClick={handleDeleteBoard}
-                  className="w-full text-left px-4 py-2 text-red-600 hover:bg-red-50 rounded-t-lg transition-all duration-200 hover:scale-105"
+                  className="w-full text-left px-4 py-2 text-red-600 hover:bg-red-50 rounded-b-lg transition-all duration-200 hover:scale-105"
                 >
                   Delete Board
                 </button>
               </div>
             </>
           )}
+          {archivedCards && (
+            <>
+              <div
+                className="fixed inset-0 z-10"
+                onClick={() => setArchivedCards(null)}
+              />
+              <div className="absolute top-full right-0 mt-2 bg-white text-gray-700 rounded-lg shadow-xl p-4 z-20 w-72 max-h-96 overflow-y-auto animate-scaleIn">
+                <div className="font-medium mb-3">Archived Cards</div>
+                {archivedCards.length === 0 && <p className="text-sm text-gray-500">No archived cards</p>}
+                <div className="space-y-2">
+                  {archivedCards.map((archived) => (
+                    <div key={archived.id} className="flex items-center justify-between gap-2 bg-gray-50 rounded p-2">
+                      <span className="text-sm truncate">{archived.title}</span>
+                      <button
+                        onClick={() => handleRestoreCard(archived)}
+                        className="text-sm text-blue-600 hover:text-blue-800 flex-shrink-0"
+                      >
+                        Restore
+                      </button>
+                    </div>
+                  ))}
+                </div>
+              </div>
+            </>
+          )}
         </div>
       </div>
     </div>
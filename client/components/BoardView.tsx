@@ -8,7 +8,7 @@ import BoardHeader from './BoardHeader';
 import ListComponent from './ListComponent';
 import CardModal from './CardModal';
 import { useBoardStore } from '@/store/boardStore';
-import { reorderLists, moveCard, createList } from '@/lib/api';
+import { moveList, moveCard, createList, getCard } from '@/lib/api';
 import { Card } from '@/types';
 
 export default function BoardView() {
@@ -55,10 +55,10 @@ export default function BoardView() {
         const [moved] = newLists.splice(oldIndex, 1);
         newLists.splice(newIndex, 0, moved);
 
-        const updatedLists = newLists.map((list, index) => ({ ...list, position: index }));
-        setLists(updatedLists);
+        setLists(newLists);
         try {
-          await reorderLists(updatedLists.map((l) => ({ id: l.id, position: l.position })));
+          const response = await moveList(activeId, { position: newIndex });
+          setLists(newLists.map((l) => (l.id === activeId ? { ...l, position: response.data.position } : l)));
         } catch (err) {
           console.error(err);
           setLists(lists);
@@ -78,19 +78,15 @@ export default function BoardView() {
         const targetList = lists.find((l) => l.id === targetListId);
         if (!targetList) return;
 
-        const newPosition = targetList.cards?.length || 0;
+        const newIndex = targetList.cards?.filter((c) => c.id !== card.id).length || 0;
 
         try {
-          await moveCard(card.id, { listId: targetListId, position: newPosition });
+          const response = await moveCard(card.id, { listId: targetListId, position: newIndex });
+          const movedCard = { ...card, listId: targetListId, position: response.data.position };
 
           const updatedLists = lists.map((list) => {
-            if (list.id === sourceListId) {
-              return { ...list, cards: list.cards?.filter((c) => c.id !== card.id) || [] };
-            }
-            if (list.id === targetListId) {
-              return { ...list, cards: [...(list.cards || []), { ...card, listId: targetListId, position: newPosition }] };
-            }
-            return list;
+            const cards = list.cards?.filter((c) => c.id !== card.id) || [];
+            return list.id === targetListId ? { ...list, cards: [...cards, movedCard] } : { ...list, cards };
           });
           setLists(updatedLists);
         } catch (err) {
@@ -107,23 +103,18 @@ export default function BoardView() {
       const sourceList = lists.find((l) => l.id === sourceListId);
       if (!targetList || !sourceList) return;
 
-      const sourceCards = sourceList.cards || [];
-      const targetCards = targetList.cards || [];
-
-      const newSourceCards = sourceCards.filter((c) => c.id !== card.id);
-      const targetIndex = targetCards.findIndex((c) => c.id === targetCard.id);
-      const newTargetCards = [...targetCards];
-      newTargetCards.splice(targetIndex, 0, { ...card, listId: targetCard.listId });
-
-      const updatedCards = newTargetCards.map((c, index) => ({ ...c, position: index }));
+      // The server takes the index among the other cards and only rekeys the moved one
+      const targetIndex = (targetList.cards || []).filter((c) => c.id !== card.id).findIndex((c) => c.id === targetCard.id);
+      if (targetIndex < 0) return;
 
       try {
-        await moveCard(card.id, { listId: targetCard.listId, position: targetIndex });
+        const response = await moveCard(card.id, { listId: targetCard.listId, position: targetIndex });
+        const movedCard = { ...card, listId: targetCard.listId, position: response.data.position };
 
         const updatedLists = lists.map((list) => {
-          if (list.id === sourceListId) return { ...list, cards: newSourceCards };
-          if (list.id === targetCard.listId) return { ...list, cards: updatedCards };
-          return list;
+          const cards = list.cards?.filter((c) => c.id !== card.id) || [];
+          if (list.id === targetCard.listId) cards.splice(targetIndex, 0, movedCard);
+          return { ...list, cards };
         });
         setLists(updatedLists);
       } catch (err) {
@@ -132,9 +123,18 @@ export default function BoardView() {
     }
   };
 
-  const handleCardClick = (card: Card) => {
+  const handleCardClick = async (card: Card) => {
+    // The board only has the compact card; fetch the full one for the modal
     setSelectedCard(card);
     setIsModalOpen(true);
+    try {
+      const response = await getCard(card.id);
+      if (useBoardStore.getState().selectedCard?.id === card.id) {
+        setSelectedCard(response.data);
+      }
+    } catch (error) {
+      console.error('Error fetching card:', error);
+    }
   };
 
   const handleCloseModal = () => {
@@ -148,7 +148,6 @@ export default function BoardView() {
       const response = await createList({
         title: newListTitle.trim(),
         boardId: board.id,
-        position: lists.length,
       });
       addList(response.data);
       setNewListTitle('');
@@ -4,6 +4,7 @@ import { useSortable } from '@dnd-kit/sortable';
 import { CSS } from '@dnd-kit/utilities';
 import { FiClock, FiUser, FiCheckSquare } from 'react-icons/fi';
 import { format } from 'date-fns';
+import { useBoardStore } from '@/store/boardStore';
 import { Card } from '@/types';
 
 interface CardComponentProps {
@@ -29,23 +30,27 @@ export default function CardComponent({ card, onClick }: CardComponentProps) {
   };
 
   const isOverdue = card.dueDate && new Date(card.dueDate) < new Date();
-  const labels = card.labels ?? [];
-  const members = card.members ?? [];
+  // Board cards are compact: ids and badge counts, resolved against the store
+  const boardLabels = useBoardStore((state) => state.labels);
+  const labelIds = card.labelIds ?? card.labels?.map((cardLabel) => cardLabel.labelId) ?? [];
+  const labels = boardLabels.filter((label) => labelIds.includes(label.id));
+  const memberCount = card.memberIds?.length ?? card.members?.length ?? 0;
   const checklists = card.checklists ?? [];
 
-  // ✅ SAFE CHECKLIST COUNTS
-  const completedChecklistItems = checklists.reduce(
+  const completedChecklistItems = card.badges?.checklistItemsCompleted ?? checklists.reduce(
     (acc, checklist) =>
       acc + (checklist.items?.filter(item => item.isCompleted).length ?? 0),
     0
   );
 
-  const totalChecklistItems = checklists.reduce(
+  const totalChecklistItems = card.badges?.checklistItems ?? checklists.reduce(
     (acc, checklist) =>
       acc + (checklist.items?.length ?? 0),
     0
   );
 
+  const attachmentCount = card.badges?.attachments ?? card.attachments?.length ?? 0;
+
   return (
     <div
       ref={setNodeRef}
@@ -59,19 +64,19 @@ export default function CardComponent({ card, onClick }: CardComponentProps) {
       {card.coverImage && (
         <div
           className="w-full h-32 rounded mb-2 bg-cover bg-center"
-          style={{ backgroundImage: `url(${card.coverImage})` }}
+          style={{ backgroundImage: `url(${card.coverThumbnail || card.coverImage})` }}
         />
       )}
 
       {/* LABELS */}
       {labels.length > 0 && (
         <div className="flex flex-wrap gap-1 mb-2">
-          {labels.map((cardLabel) => (
+          {labels.map((label) => (
             <div
-              key={cardLabel.id}
+              key={label.id}
               className="h-2 rounded flex-1 min-w-[40px] transition-all duration-200 hover:opacity-80 hover:scale-105"
-              style={{ backgroundColor: cardLabel.label.color }}
-              title={cardLabel.label.name}
+              style={{ backgroundColor: label.color }}
+              title={label.name}
             />
           ))}
         </div>
@@ -93,10 +98,10 @@ export default function CardComponent({ card, onClick }: CardComponentProps) {
         )}
 
         {/* MEMBERS */}
-        {members.length > 0 && (
+        {memberCount > 0 && (
           <div className="flex items-center gap-1">
             <FiUser size={12} />
-            <span>{members.length}</span>
+            <span>{memberCount}</span>
           </div>
         )}
 
@@ -111,9 +116,9 @@ export default function CardComponent({ card, onClick }: CardComponentProps) {
         )}
 
         {/* ATTACHMENTS */}
-        {card.attachments && card.attachments.length > 0 && (
+        {attachmentCount > 0 && (
           <div className="flex items-center gap-1">
-            <span>📎 {card.attachments.length}</span>
+            <span>📎 {attachmentCount}</span>
           </div>
         )}
       </div>
@@ -7,6 +7,7 @@ import { useBoardStore } from '@/store/boardStore';
 import {
   updateCard,
   deleteCard,
+  archiveCard,
   addLabelToCard,
   removeLabelFromCard,
   addMemberToCard,
@@ -18,6 +19,7 @@ import {
   deleteChecklistItem,
   uploadAttachment,
   deleteAttachment,
+  getComments,
   createComment,
   deleteComment,
 } from '@/lib/api';
@@ -41,6 +43,9 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
   const [newChecklistTitle, setNewChecklistTitle] = useState('');
   const [showAddChecklist, setShowAddChecklist] = useState(false);
   const [commentText, setCommentText] = useState('');
+  // Comments aren't part of the card; they're paged in newest first
+  const [comments, setComments] = useState<Comment[]>([]);
+  const [commentsCursor, setCommentsCursor] = useState<string | undefined>();
 
   useEffect(() => {
     if (selectedCard) {
@@ -51,6 +56,24 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
     }
   }, [selectedCard]);
 
+  const cardId = selectedCard?.id;
+  useEffect(() => {
+    setComments([]);
+    setCommentsCursor(undefined);
+    if (!cardId) return;
+    let cancelled = false;
+    getComments(cardId)
+      .then((response) => {
+        if (cancelled) return;
+        setComments(response.data);
+        setCommentsCursor(response.headers['x-next-cursor']);
+      })
+      .catch((error) => console.error('Error loading comments:', error));
+    return () => {
+      cancelled = true;
+    };
+  }, [cardId]);
+
   if (!isOpen || !card || !board) return null;
 
   // --- Update Handlers ---
@@ -255,6 +278,17 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
   };
 
   // --- Comment Handlers ---
+  const handleLoadMoreComments = async () => {
+    if (!commentsCursor) return;
+    try {
+      const response = await getComments(card.id, { cursor: commentsCursor });
+      setComments([...comments, ...response.data]);
+      setCommentsCursor(response.headers['x-next-cursor']);
+    } catch (error) {
+      console.error('Error loading comments:', error);
+    }
+  };
+
   const handleAddComment = async () => {
     if (!commentText.trim() || !users[0]) return;
     try {
@@ -262,10 +296,7 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
         text: commentText.trim(),
         userId: users[0].id,
       });
-      setCard({
-        ...card,
-        comments: [response.data, ...(card.comments || [])],
-      });
+      setComments([response.data, ...comments]);
       setCommentText('');
       updateCardStore(card.id, {});
     } catch (error) {
@@ -276,16 +307,25 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
   const handleDeleteComment = async (commentId: string) => {
     try {
       await deleteComment(commentId);
-      setCard({
-        ...card,
-        comments: card.comments?.filter((c: Comment) => c.id !== commentId) || [],
-      });
+      setComments(comments.filter((c: Comment) => c.id !== commentId));
       updateCardStore(card.id, {});
     } catch (error) {
       console.error('Error deleting comment:', error);
     }
   };
 
+  // --- Card Archive ---
+  const handleArchiveCard = async () => {
+    try {
+      await archiveCard(card.id);
+      // Archived cards leave the board; they're restored from the board menu
+      deleteCardStore(card.id);
+      onClose();
+    } catch (error) {
+      console.error('Error archiving card:', error);
+    }
+  };
+
   // --- Card Delete ---
   const handleDeleteCard = async () => {
     if (confirm('Are you sure you want to delete this card?')) {
@@ -303,7 +343,6 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
   const cardMembers = card.members || [];
   const cardChecklists = card.checklists || [];
   const cardAttachments = card.attachments || [];
-  const cardComments = card.comments || [];
   const isOverdue = card.dueDate && new Date(card.dueDate) < new Date();
 
   // --- JSX rendering remains mostly unchanged, including AddChecklistItemInput component ---
@@ -563,7 +602,7 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
                       Save
                     </button>
                   </div>
-                    {cardComments.map((comment) => (
+                    {comments.map((comment) => (
                     <div key={comment.id} className="bg-gray-50 rounded p-3 group/comment animate-fadeIn hover:bg-gray-100 transition-all duration-200">
                       <div className="flex items-start justify-between">
                         <div className="flex-1">
@@ -591,6 +630,14 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
                       </div>
                     </div>
                   ))}
+                  {commentsCursor && (
+                    <button
+                      onClick={handleLoadMoreComments}
+                      className="w-full px-3 py-2 bg-gray-100 hover:bg-gray-200 rounded text-sm text-gray-700"
+                    >
+                      Show older comments
+                    </button>
+                  )}
                 </div>
               </div>
             </div>
@@ -712,6 +759,12 @@ export default function CardModal({ isOpen, onClose }: CardModalProps) {
 
               <div>
                 <h3 className="text-xs font-semibold text-gray-600 uppercase mb-2">Actions</h3>
+                <button
+                  onClick={handleArchiveCard}
+                  className="w-full text-left px-3 py-2 mb-2 bg-gray-100 hover:bg-gray-200 rounded text-sm"
+                >
+                  Archive Card
+                </button>
                 <button
                   onClick={handleDeleteCard}
                   className="w-full text-left px-3 py-2 bg-red-100 hover:bg-red-200 text-red-700 rounded text-sm"
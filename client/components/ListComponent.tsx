@@ -42,7 +42,6 @@ export default function ListComponent({ list, onCardClick }: ListComponentProps)
       const response = await createCard({
         title: cardTitle.trim(),
         listId: list.id,
-        position: cards.length,
       });
 
       addCard(response.data);
@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api';
+export const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api';
 
 const api = axios.create({
   baseURL: API_URL,
@@ -9,9 +9,45 @@ const api = axios.create({
   },
 });
 
+// Writes answer with a time until which our reads should skip the read
+// replicas, so we never read back data from before our own change
+const READ_PRIMARY_HEADER = 'X-Read-Primary-Until';
+let readPrimaryUntil = 0;
+api.interceptors.response.use((response) => {
+  const until = Number(response.headers[READ_PRIMARY_HEADER.toLowerCase()]);
+  if (until) readPrimaryUntil = until;
+  return response;
+});
+api.interceptors.request.use((config) => {
+  if (readPrimaryUntil > Date.now() / 1000) {
+    config.headers.set(READ_PRIMARY_HEADER, String(readPrimaryUntil));
+  }
+  return config;
+});
+
+// List endpoints return one page at a time; the next page's cursor comes
+// back in the X-Next-Cursor header
+export const getAllPages = async (url: string, params: Record<string, any> = {}) => {
+  const data: any[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await api.get(url, { params: { ...params, limit: 200, cursor } });
+    data.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return { data };
+};
+
 // Boards
 export const getBoards = () => api.get('/boards');
+export const getBoardSummaries = () => api.get('/boards/summary');
 export const getBoard = (id: string) => api.get(`/boards/${id}`);
+export const getBoardChanges = (id: string, since: number) => api.get(`/boards/${id}/changes`, { params: { since } });
+// Board ETags are "board-{id}-{version}"
+export const boardVersion = (etag?: string) => {
+  const match = etag?.match(/-(\d+)"$/);
+  return match ? Number(match[1]) : undefined;
+};
 export const createBoard = (data: { title: string; description?: string; background?: string }) =>
   api.post('/boards', data);
 export const updateBoard = (id: string, data: { title?: string; description?: string; background?: string }) =>
@@ -27,19 +63,29 @@ export const updateList = (id: string, data: { title?: string; position?: number
   api.put(`/lists/${id}`, data);
 export const reorderLists = (lists: { id: string; position: number }[]) =>
   api.put('/lists/reorder', { lists });
+// position is the target index; the server assigns the list's new rank key
+export const moveList = (id: string, data: { position: number }) =>
+  api.put(`/lists/${id}/move`, data);
 export const deleteList = (id: string) => api.delete(`/lists/${id}`);
 
 // Cards
 export const getCards = (listId: string) => api.get(`/cards/list/${listId}`);
 export const getCard = (id: string) => api.get(`/cards/${id}`);
+// position is a rank key; leave it out to append to the list
 export const createCard = (data: { title: string; description?: string; listId: string; position?: number; dueDate?: string }) =>
   api.post('/cards', data);
 export const updateCard = (id: string, data: any) => api.put(`/cards/${id}`, data);
+// position is the target index; the server assigns the card's new rank key
 export const moveCard = (id: string, data: { listId: string; position: number }) =>
   api.put(`/cards/${id}/move`, data);
 export const reorderCards = (cards: { id: string; listId: string; position: number }[]) =>
   api.put('/cards/reorder', { cards });
 export const deleteCard = (id: string) => api.delete(`/cards/${id}`);
+export const archiveCard = (id: string) => api.post(`/cards/${id}/archive`);
+// listId is needed only if the card's list has been deleted since
+export const restoreCard = (id: string, data: { listId?: string } = {}) =>
+  api.post(`/cards/${id}/restore`, data);
+export const getArchivedCards = (boardId: string) => api.get(`/boards/${boardId}/archive`);
 
 // Labels
 export const getLabels = (boardId: string) => api.get(`/labels/board/${boardId}`);
@@ -88,6 +134,8 @@ export const uploadAttachment = (cardId: string, file: File) => {
 export const deleteAttachment = (id: string) => api.delete(`/cards/attachments/${id}`);
 
 // Comments
+export const getComments = (cardId: string, params: { cursor?: string; limit?: number } = {}) =>
+  api.get(`/cards/${cardId}/comments`, { params });
 export const createComment = (cardId: string, data: { text: string; userId: string }) =>
   api.post(`/cards/${cardId}/comments`, data);
 export const updateComment = (id: string, data: { text: string }) =>
@@ -95,7 +143,7 @@ export const updateComment = (id: string, data: { text: string }) =>
 export const deleteComment = (id: string) => api.delete(`/cards/comments/${id}`);
 
 // Users
-export const getUsers = () => api.get('/users');
+export const getUsers = () => getAllPages('/users');
 export const getUser = (id: string) => api.get(`/users/${id}`);
 
 // Search
@@ -105,6 +153,8 @@ export const searchCards = (params: {
   userId?: string;
   dueDate?: string;
   boardId?: string;
+  cursor?: string;
+  limit?: number;
 }) => api.get('/search/cards', { params });
 
 export default api;
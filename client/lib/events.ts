@@ -0,0 +1,39 @@
+import { API_URL } from './api';
+
+export interface BoardEvent {
+  type: string;
+  boardId: string;
+  version: number;
+  data: Record<string, any>;
+}
+
+// Listen for changes to a board over a WebSocket, falling back to
+// server-sent events if the socket can't be opened. Returns an unsubscribe.
+export const subscribeToBoard = (boardId: string, onEvent: (event: BoardEvent) => void) => {
+  const url = `${API_URL}/boards/${boardId}/events`;
+  let eventSource: EventSource | null = null;
+  let closed = false;
+
+  const fallBack = () => {
+    if (closed || eventSource) return;
+    eventSource = new EventSource(url);
+    eventSource.onmessage = (message) => onEvent(JSON.parse(message.data));
+  };
+
+  let socket: WebSocket | null = null;
+  try {
+    socket = new WebSocket(url.replace(/^http/, 'ws'));
+    socket.onmessage = (message) => onEvent(JSON.parse(message.data));
+    socket.onerror = () => {
+      if (socket?.readyState !== WebSocket.OPEN) fallBack();
+    };
+  } catch {
+    fallBack();
+  }
+
+  return () => {
+    closed = true;
+    socket?.close();
+    eventSource?.close();
+  };
+};
@@ -1,5 +1,5 @@
 import { create } from 'zustand';
-import { Board, List, Card, Label, User } from '@/types';
+import { Board, BoardDelta, List, Card, Label, User } from '@/types';
 
 interface BoardStore {
   board: Board | null;
@@ -21,8 +21,12 @@ interface BoardStore {
   setLabels: (labels: Label[]) => void;
   setUsers: (users: User[]) => void;
   setLoading: (isLoading: boolean) => void;
+  applyBoardDelta: (delta: BoardDelta) => void;
 }
 
+// Positions are the server's rank keys, never local indexes, so merged rows sort in with local ones
+const byPosition = (a: { position: number }, b: { position: number }) => a.position - b.position;
+
 export const useBoardStore = create<BoardStore>((set, get) => ({
   board: null,
   lists: [],
@@ -39,7 +43,7 @@ export const useBoardStore = create<BoardStore>((set, get) => ({
     set({
       lists: get().lists.map((list) =>
         list.id === card.listId
-          ? { ...list, cards: [...(list.cards || []), card] }
+          ? { ...list, cards: [...(list.cards || []), card].sort(byPosition) }
           : list
       ),
     }),
@@ -75,4 +79,39 @@ export const useBoardStore = create<BoardStore>((set, get) => ({
   setLabels: (labels) => set({ labels }),
   setUsers: (users) => set({ users }),
   setLoading: (isLoading) => set({ isLoading }),
+
+  applyBoardDelta: (delta) => {
+    const { board, lists, labels, selectedCard } = get();
+    const deletedLists = new Set(delta.deleted.lists);
+    // Changed cards are pulled out everywhere and re-inserted, since they may have changed list
+    const removedCards = new Set([...delta.deleted.cards, ...delta.cards.map((card) => card.id)]);
+    const changedLists = new Map(delta.lists.map((list) => [list.id, list]));
+
+    const nextLists = lists
+      .filter((list) => !deletedLists.has(list.id))
+      .map((list) => ({
+        ...list,
+        ...changedLists.get(list.id),
+        cards: (list.cards || []).filter((card) => !removedCards.has(card.id)),
+      }));
+    for (const list of delta.lists) {
+      if (!lists.some((existing) => existing.id === list.id)) nextLists.push({ ...list, cards: [] });
+    }
+    for (const card of delta.cards) {
+      nextLists.find((list) => list.id === card.listId)?.cards?.push(card);
+    }
+    nextLists.forEach((list) => list.cards?.sort(byPosition));
+
+    const deletedLabels = new Set(delta.deleted.labels);
+    const changedLabels = new Set(delta.labels.map((label) => label.id));
+    set({
+      board: board && delta.board ? { ...board, ...delta.board } : board,
+      lists: nextLists.sort(byPosition),
+      labels: [
+        ...labels.filter((label) => !deletedLabels.has(label.id) && !changedLabels.has(label.id)),
+        ...delta.labels,
+      ],
+      selectedCard: selectedCard && delta.deleted.cards.includes(selectedCard.id) ? null : selectedCard,
+    });
+  },
 }));
@@ -17,6 +17,29 @@ export interface Board {
   lists?: List[];
 }
 
+// GET /boards/{id}/changes: what changed after version `since`
+export interface BoardDelta {
+  version: number;
+  since: number;
+  resync: boolean;
+  board?: Omit<Board, 'lists'> | null;
+  lists: Omit<List, 'cards'>[];
+  cards: Card[];
+  labels: Label[];
+  deleted: { lists: string[]; cards: string[]; labels: string[] };
+}
+
+export interface BoardSummary {
+  id: string;
+  title: string;
+  description?: string;
+  background?: string;
+  createdAt: string;
+  updatedAt?: string | null;
+  listCount: number;
+  cardCount: number;
+}
+
 export interface List {
   id: string;
   title: string;
@@ -33,6 +56,8 @@ export interface Card {
   description?: string;
   position: number;
   coverImage?: string | null;
+  // Board payloads only: the cover at thumbnail size, when there is one
+  coverThumbnail?: string | null;
   dueDate?: string | null;
   listId: string;
   createdAt: string;
@@ -41,8 +66,27 @@ export interface Card {
   members?: CardMember[];
   checklists?: Checklist[];
   attachments?: Attachment[];
-  comments?: Comment[];
   list?: List;
+  // Set while the card is archived; archived cards aren't in board payloads
+  archivedAt?: string | null;
+  // Board payloads carry these instead of the nested collections above
+  labelIds?: string[];
+  memberIds?: string[];
+  badges?: CardBadges;
+}
+
+export interface ArchivedCard {
+  id: string;
+  title: string;
+  listId: string;
+  archivedAt: string;
+}
+
+export interface CardBadges {
+  comments: number;
+  attachments: number;
+  checklistItems: number;
+  checklistItemsCompleted: number;
 }
 
 export interface Label {
@@ -94,6 +138,9 @@ export interface Attachment {
   url: string;
   type: string;
   size?: number;
+  // Downscaled copies of images, filled in shortly after upload
+  thumbnailUrl?: string | null;
+  previewUrl?: string | null;
   cardId: string;
   createdAt: string;
 }
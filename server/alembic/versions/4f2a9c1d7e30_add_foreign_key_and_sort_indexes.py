@@ -0,0 +1,58 @@
+"""add foreign key and sort indexes
+
+Revision ID: 4f2a9c1d7e30
+Revises: 
+Create Date: 2026-10-18 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2a9c1d7e30'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_users_name", "users", ["name"]),
+    ("ix_boards_created_at", "boards", ["created_at"]),
+    ("ix_lists_board_id_position", "lists", ["board_id", "position"]),
+    ("ix_cards_list_id_position", "cards", ["list_id", "position"]),
+    ("ix_cards_created_at", "cards", ["created_at"]),
+    ("ix_labels_board_id_created_at", "labels", ["board_id", "created_at"]),
+    ("ix_card_labels_label_id", "card_labels", ["label_id"]),
+    ("ix_card_members_user_id", "card_members", ["user_id"]),
+    ("ix_checklists_card_id_position", "checklists", ["card_id", "position"]),
+    ("ix_checklist_items_checklist_id_position", "checklist_items", ["checklist_id", "position"]),
+    ("ix_attachments_card_id_created_at", "attachments", ["card_id", "created_at"]),
+    ("ix_comments_card_id_created_at", "comments", ["card_id", "created_at"]),
+    ("ix_comments_user_id", "comments", ["user_id"]),
+]
+
+UNIQUE_INDEXES = [
+    ("uq_card_labels_card_id_label_id", "card_labels", ["card_id", "label_id"]),
+    ("uq_card_members_card_id_user_id", "card_members", ["card_id", "user_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+    # The add-label/add-member routes only checked for duplicates before
+    # inserting, so concurrent requests may have left some behind
+    for name, table, columns in UNIQUE_INDEXES:
+        group = ", ".join(columns)
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY {group})"
+        )
+        op.create_index(name, table, columns, unique=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(UNIQUE_INDEXES + INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
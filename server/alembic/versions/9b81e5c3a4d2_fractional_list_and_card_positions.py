@@ -0,0 +1,52 @@
+"""fractional list and card positions
+
+Revision ID: 9b81e5c3a4d2
+Revises: 4f2a9c1d7e30
+Create Date: 2026-10-18 10:03:17.552941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b81e5c3a4d2'
+down_revision = '4f2a9c1d7e30'
+branch_labels = None
+depends_on = None
+
+# Must match app.ranking.POSITION_STEP
+POSITION_STEP = 1024
+
+
+def upgrade() -> None:
+    for table in ("lists", "cards"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                "position",
+                existing_type=sa.Integer(),
+                type_=sa.Float(),
+                existing_nullable=False,
+            )
+        # Spread the existing 0, 1, 2, ... positions out so moves have room
+        op.execute(f"UPDATE {table} SET position = position * {POSITION_STEP}")
+
+
+def downgrade() -> None:
+    for table in ("lists", "cards"):
+        # Collapse rank keys back to dense integer positions
+        parent = "board_id" if table == "lists" else "list_id"
+        op.execute(
+            f"UPDATE {table} SET position = ("
+            f"SELECT COUNT(*) FROM {table} AS other "
+            f"WHERE other.{parent} = {table}.{parent} "
+            f"AND (other.position < {table}.position "
+            f"OR (other.position = {table}.position AND other.id < {table}.id)))"
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                "position",
+                existing_type=sa.Float(),
+                type_=sa.Integer(),
+                existing_nullable=False,
+            )
@@ -0,0 +1,43 @@
+"""add card badge counters
+
+Revision ID: a7c3e9d25f61
+Revises: f1c6b8e24d93
+Create Date: 2026-10-18 21:06:33.184207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d25f61'
+down_revision = 'f1c6b8e24d93'
+branch_labels = None
+depends_on = None
+
+
+COUNTERS = ("comment_count", "attachment_count", "checklist_total", "checklist_done")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("cards") as batch_op:
+        for name in COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+    # Same counts as app/badges.py recount()
+    op.execute(
+        "UPDATE cards SET "
+        "comment_count = (SELECT count(*) FROM comments WHERE comments.card_id = cards.id), "
+        "attachment_count = (SELECT count(*) FROM attachments WHERE attachments.card_id = cards.id), "
+        "checklist_total = (SELECT count(*) FROM checklist_items "
+        "JOIN checklists ON checklists.id = checklist_items.checklist_id "
+        "WHERE checklists.card_id = cards.id), "
+        "checklist_done = (SELECT count(*) FROM checklist_items "
+        "JOIN checklists ON checklists.id = checklist_items.checklist_id "
+        "WHERE checklists.card_id = cards.id AND checklist_items.is_completed = true)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("cards") as batch_op:
+        for name in reversed(COUNTERS):
+            batch_op.drop_column(name)
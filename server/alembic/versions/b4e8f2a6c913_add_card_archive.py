@@ -0,0 +1,49 @@
+"""add card archive
+
+Revision ID: b4e8f2a6c913
+Revises: a7c3e9d25f61
+Create Date: 2026-10-18 22:37:15.602941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e8f2a6c913'
+down_revision = 'a7c3e9d25f61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("cards") as batch_op:
+        batch_op.add_column(sa.Column("archived_at", sa.DateTime(), nullable=True))
+        batch_op.create_index("ix_cards_archived_at", ["archived_at"])
+    op.create_table(
+        "card_archives",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("board_id", sa.String(), sa.ForeignKey("boards.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("list_id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.Column("moved_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_card_archives_board_id_archived_at", "card_archives", ["board_id", "archived_at"])
+    op.create_table(
+        "card_archive_blobs",
+        sa.Column("card_id", sa.String(), sa.ForeignKey("card_archives.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("blob_key", sa.String(), sa.ForeignKey("blobs.key"), primary_key=True),
+    )
+    op.create_index("ix_card_archive_blobs_blob_key", "card_archive_blobs", ["blob_key"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_card_archive_blobs_blob_key", table_name="card_archive_blobs")
+    op.drop_table("card_archive_blobs")
+    op.drop_index("ix_card_archives_board_id_archived_at", table_name="card_archives")
+    op.drop_table("card_archives")
+    with op.batch_alter_table("cards") as batch_op:
+        batch_op.drop_index("ix_cards_archived_at")
+        batch_op.drop_column("archived_at")
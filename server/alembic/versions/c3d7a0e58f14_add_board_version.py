@@ -0,0 +1,26 @@
+"""add board version
+
+Revision ID: c3d7a0e58f14
+Revises: 9b81e5c3a4d2
+Create Date: 2026-10-18 11:42:05.310927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d7a0e58f14'
+down_revision = '9b81e5c3a4d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("boards") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("boards") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,34 @@
+"""add board change log
+
+Revision ID: d8e4b1f06a27
+Revises: c3d7a0e58f14
+Create Date: 2026-10-18 14:05:31.472190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e4b1f06a27'
+down_revision = 'c3d7a0e58f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "board_changes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("board_id", sa.String(), sa.ForeignKey("boards.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("op", sa.String(), nullable=False),
+    )
+    op.create_index("ix_board_changes_board_id_version", "board_changes", ["board_id", "version"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_board_changes_board_id_version", table_name="board_changes")
+    op.drop_table("board_changes")
@@ -0,0 +1,39 @@
+"""add content-addressed blobs
+
+Revision ID: e5a92c7d3b18
+Revises: d8e4b1f06a27
+Create Date: 2026-10-18 16:42:09.318455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a92c7d3b18'
+down_revision = 'd8e4b1f06a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "blobs",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    # Existing attachments keep their own files and a null blob_key
+    with op.batch_alter_table("attachments") as batch_op:
+        batch_op.add_column(sa.Column("blob_key", sa.String(), nullable=True))
+        batch_op.create_foreign_key("fk_attachments_blob_key", "blobs", ["blob_key"], ["key"])
+        batch_op.create_index("ix_attachments_blob_key", ["blob_key"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("attachments") as batch_op:
+        batch_op.drop_index("ix_attachments_blob_key")
+        batch_op.drop_constraint("fk_attachments_blob_key", type_="foreignkey")
+        batch_op.drop_column("blob_key")
+    op.drop_table("blobs")
@@ -0,0 +1,31 @@
+"""add attachment thumbnails
+
+Revision ID: f1c6b8e24d93
+Revises: e5a92c7d3b18
+Create Date: 2026-10-18 18:11:47.506312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6b8e24d93'
+down_revision = 'e5a92c7d3b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("attachments") as batch_op:
+        batch_op.add_column(sa.Column("thumbnail_url", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("preview_url", sa.String(), nullable=True))
+        # Board loads look up cover images among attachments by url
+        batch_op.create_index("ix_attachments_url", ["url"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("attachments") as batch_op:
+        batch_op.drop_index("ix_attachments_url")
+        batch_op.drop_column("preview_url")
+        batch_op.drop_column("thumbnail_url")
@@ -0,0 +1,198 @@
+"""
+Archived cards and their cold storage.
+
+Archiving a card sets `cards.archived_at`. From then on it's left out of board
+and list views, the change feed and search (unless asked for), but it's still
+an ordinary row, so restoring it soon after is just clearing the flag.
+
+Cards archived for longer than ARCHIVE_MOVE_AFTER_DAYS are moved out of the
+live tables by the mover: the card and its labels, members, checklists,
+items, attachments and comments become one `card_archives` row holding them
+as zlib-compressed JSON, and the rows themselves are deleted. That keeps the
+tables every board load and search scans down to the working set. The files
+of a moved card's attachments are kept alive by `card_archive_blobs`.
+
+Restoring a moved card writes its rows back with their original ids. Labels
+and users deleted in the meantime are dropped from it, and if its list is gone
+it goes to the end of the list it's restored to.
+
+The mover runs every ARCHIVE_MOVE_INTERVAL seconds in the API process (0 turns
+that off); `python archive_cards.py` runs it once, e.g. from cron.
+"""
+import asyncio
+import os
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import orjson
+from sqlalchemy import DateTime, delete, insert, select, union_all
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app import badges, models, ranking
+from app.search_index import search_index
+
+ARCHIVE_MOVE_AFTER = timedelta(days=float(os.getenv("ARCHIVE_MOVE_AFTER_DAYS", "30")))
+ARCHIVE_MOVE_INTERVAL = float(os.getenv("ARCHIVE_MOVE_INTERVAL", "3600"))
+# Cards moved per transaction
+ARCHIVE_MOVE_BATCH = int(os.getenv("ARCHIVE_MOVE_BATCH", "200"))
+
+# Bumped if the payload layout changes, so old archives can still be read
+PAYLOAD_FORMAT = 1
+
+# What a card is stored with, parents before children so restoring can insert in order
+_CHILDREN = (
+    (models.CardLabel, models.CardLabel.card_id),
+    (models.CardMember, models.CardMember.card_id),
+    (models.Checklist, models.Checklist.card_id),
+    (models.ChecklistItem, models.Checklist.card_id),
+    (models.Attachment, models.Attachment.card_id),
+    (models.Comment, models.Comment.card_id),
+)
+
+def _encode(tables: Dict[str, List[dict]]) -> bytes:
+    return zlib.compress(orjson.dumps({"format": PAYLOAD_FORMAT, "tables": tables}))
+
+def _decode(payload: bytes) -> Dict[str, List[dict]]:
+    return orjson.loads(zlib.decompress(payload))["tables"]
+
+def _rows(model, rows: List[dict]) -> List[dict]:
+    """Stored rows as column values for `model` today: timestamps parsed, dropped columns left out"""
+    columns = {column.key: column for column in model.__table__.columns}
+    return [
+        {
+            key: datetime.fromisoformat(value) if value is not None and isinstance(columns[key].type, DateTime) else value
+            for key, value in row.items() if key in columns
+        }
+        for row in rows
+    ]
+
+async def move_archived(older_than: timedelta = ARCHIVE_MOVE_AFTER, limit: int = ARCHIVE_MOVE_BATCH) -> int:
+    """Move up to `limit` cards archived before `older_than` ago into card_archives; returns how many"""
+    async with AsyncSessionLocal() as db:
+        cards = (await db.execute(
+            select(models.Card.__table__, models.List.board_id)
+            .join(models.List, models.List.id == models.Card.list_id)
+            .where(models.Card.archived_at <= datetime.now(timezone.utc) - older_than)
+            .order_by(models.Card.archived_at)
+            .limit(limit)
+            # Workers running the mover at once take different cards
+            .with_for_update(of=models.Card.__table__, skip_locked=True)
+        )).mappings().all()
+        if not cards:
+            return 0
+        card_ids = [card["id"] for card in cards]
+
+        tables = {card_id: defaultdict(list) for card_id in card_ids}
+        for card in cards:
+            tables[card["id"]]["cards"].append({key: value for key, value in card.items() if key != "board_id"})
+        for model, card_column in _CHILDREN:
+            stmt = select(model.__table__, card_column.label("archived_card_id")).where(card_column.in_(card_ids))
+            if model is models.ChecklistItem:
+                stmt = stmt.select_from(models.ChecklistItem.__table__.join(models.Checklist.__table__))
+            for row in (await db.execute(stmt)).mappings():
+                row = dict(row)
+                tables[row.pop("archived_card_id")][model.__tablename__].append(row)
+
+        await db.execute(insert(models.CardArchive).values([
+            {
+                "id": card["id"],
+                "board_id": card["board_id"],
+                "list_id": card["list_id"],
+                "title": card["title"],
+                # Copied in SQL, so it's stored exactly as the card had it
+                # and both kinds of archived card page together
+                "archived_at": select(models.Card.archived_at).where(models.Card.id == card["id"]).scalar_subquery(),
+                "payload": _encode(tables[card["id"]]),
+            }
+            for card in cards
+        ]))
+        blob_refs = {
+            (card_id, attachment["blob_key"])
+            for card_id in card_ids
+            for attachment in tables[card_id]["attachments"] if attachment["blob_key"]
+        }
+        if blob_refs:
+            await db.execute(insert(models.CardArchiveBlob), [
+                {"card_id": card_id, "blob_key": key} for card_id, key in blob_refs
+            ])
+
+        # Archived cards already left the board views, so no version moves
+        await search_index.remove_cards(db, card_ids)
+        checklist_ids = select(models.Checklist.id).where(models.Checklist.card_id.in_(card_ids))
+        await db.execute(delete(models.ChecklistItem).where(models.ChecklistItem.checklist_id.in_(checklist_ids)))
+        for model, card_column in _CHILDREN:
+            if model is not models.ChecklistItem:
+                await db.execute(delete(model).where(card_column.in_(card_ids)))
+        await db.execute(delete(models.Card).where(models.Card.id.in_(card_ids)))
+        await db.commit()
+        return len(cards)
+
+async def move_all_archived(older_than: timedelta = ARCHIVE_MOVE_AFTER) -> int:
+    moved = 0
+    while True:
+        batch = await move_archived(older_than)
+        moved += batch
+        if batch < ARCHIVE_MOVE_BATCH:
+            return moved
+
+async def run_mover():
+    while True:
+        await asyncio.sleep(ARCHIVE_MOVE_INTERVAL)
+        try:
+            await move_all_archived()
+        except DBAPIError:
+            # Locked or unreachable this time; the cards are still there next time
+            pass
+
+async def restore(db: AsyncSession, archived: models.CardArchive, card_list: models.List) -> str:
+    """Put a moved card back in the live tables, in `card_list`; the caller touches its board and commits"""
+    tables = _decode(archived.payload)
+    card = _rows(models.Card, tables["cards"])[0]
+    card["archived_at"] = None
+    if card_list.id != card["list_id"]:
+        card["list_id"] = card_list.id
+        card["position"] = ranking.append_position(models.Card, models.Card.list_id, card_list.id)
+    db.add(models.Card(**card))
+
+    # Labels and users may have been deleted since, taking their links with them
+    label_ids = set((await db.scalars(
+        select(models.Label.id).where(models.Label.board_id == card_list.board_id)
+    )).all())
+    user_ids = {row["user_id"] for name in ("card_members", "comments") for row in tables.get(name, ())}
+    user_ids = set((await db.scalars(select(models.User.id).where(models.User.id.in_(user_ids)))).all())
+    keep = {
+        models.CardLabel: lambda row: row["label_id"] in label_ids,
+        models.CardMember: lambda row: row["user_id"] in user_ids,
+        models.Comment: lambda row: row["user_id"] in user_ids,
+    }
+    restored = defaultdict(list)
+    for model, _ in _CHILDREN:
+        for row in _rows(model, tables.get(model.__tablename__, ())):
+            if model in keep and not keep[model](row):
+                continue
+            restored[model].append(model(**row))
+    db.add_all(obj for objs in restored.values() for obj in objs)
+
+    await db.execute(delete(models.CardArchiveBlob).where(models.CardArchiveBlob.card_id == archived.id))
+    await db.delete(archived)
+    await db.flush()
+    await db.execute(badges.recount([card["id"]]))
+
+    await search_index.index_card(db, await db.get(models.Card, card["id"]))
+    for comment in restored[models.Comment]:
+        await search_index.index_comment(db, comment)
+    for item in restored[models.ChecklistItem]:
+        await search_index.index_checklist_item(db, item, card["id"])
+    return card["id"]
+
+def listing(board_id: str):
+    """SELECT of (id, title, list_id, archived_at) for a board's archived cards, flagged or moved"""
+    return union_all(
+        select(models.Card.id, models.Card.title, models.Card.list_id, models.Card.archived_at)
+        .join(models.List, models.List.id == models.Card.list_id)
+        .where(models.List.board_id == board_id, models.Card.archived_at.is_not(None)),
+        select(models.CardArchive.id, models.CardArchive.title, models.CardArchive.list_id, models.CardArchive.archived_at)
+        .where(models.CardArchive.board_id == board_id),
+    ).subquery()
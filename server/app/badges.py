@@ -0,0 +1,54 @@
+"""
+Badge counters on cards.
+
+The board view shows how many comments, attachments and checklist items (and
+how many of those are done) each card has. Those are columns on `cards`, kept
+up to date by the writes that change them in the same transaction, so loading
+a board never reads the child tables.
+
+Writes adjust the counters with `adjust()`, an atomic increment, so concurrent
+writes to one card don't lose updates. `recount()` rebuilds them from the
+child tables; `python recount_badges.py` runs it over every card to repair
+drift (say, after rows were edited by hand).
+"""
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+COUNTERS = ("comment_count", "attachment_count", "checklist_total", "checklist_done")
+
+async def adjust(db: AsyncSession, card_id: str, **deltas: int):
+    """Add each delta (e.g. comment_count=1) to the card's counters"""
+    values = {name: getattr(models.Card, name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return
+    await db.execute(update(models.Card).where(models.Card.id == card_id).values(**values))
+
+async def checklist_counts(db: AsyncSession, checklist_id: str):
+    """(items, completed items) on a checklist"""
+    result = await db.execute(
+        select(func.count(), func.count().filter(models.ChecklistItem.is_completed.is_(True)))
+        .where(models.ChecklistItem.checklist_id == checklist_id)
+    )
+    return result.one()
+
+def _counted(*criteria, join=None):
+    stmt = select(func.count())
+    if join is not None:
+        stmt = stmt.select_from(join)
+    return stmt.where(*criteria).scalar_subquery()
+
+def recount(card_ids=None):
+    """UPDATE setting every counter from the child tables, for `card_ids` or all cards"""
+    items = models.ChecklistItem.__table__.join(models.Checklist.__table__)
+    stmt = update(models.Card).values(
+        comment_count=_counted(models.Comment.card_id == models.Card.id),
+        attachment_count=_counted(models.Attachment.card_id == models.Card.id),
+        checklist_total=_counted(models.Checklist.card_id == models.Card.id, join=items),
+        checklist_done=_counted(
+            models.Checklist.card_id == models.Card.id, models.ChecklistItem.is_completed.is_(True), join=items,
+        ),
+    )
+    if card_ids is not None:
+        stmt = stmt.where(models.Card.id.in_(card_ids))
+    return stmt.execution_options(synchronize_session=False)
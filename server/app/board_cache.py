@@ -0,0 +1,121 @@
+"""
+Cache of serialized board trees.
+
+Boards are read far more often than they're written, so GET /api/boards/{id}
+keeps the JSON bytes it produced and serves them again until the board
+changes. Entries are tagged with the board version they were built from and
+only served for that version, so a request racing a write can never resurrect
+a stale tree; commits that touch a board also drop its entry outright.
+
+BOARD_CACHE_URL picks the backend: "memory" (the default, an LRU per worker),
+"redis://..." (shared between workers, needs the redis package) or "off".
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+from app import versioning
+
+class BoardCache:
+    async def get(self, board_id: str, version: int) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def put(self, board_id: str, version: int, body: bytes):
+        raise NotImplementedError
+
+    async def invalidate(self, board_ids: Iterable[str]):
+        raise NotImplementedError
+
+class NullBoardCache(BoardCache):
+    async def get(self, board_id, version):
+        return None
+
+    async def put(self, board_id, version, body):
+        pass
+
+    async def invalidate(self, board_ids):
+        pass
+
+class MemoryBoardCache(BoardCache):
+    """LRU bounded by the total size of the cached bodies, with a TTL as a backstop"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def _drop(self, board_id):
+        entry = self._entries.pop(board_id, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+    async def get(self, board_id, version):
+        entry = self._entries.get(board_id)
+        if entry is None:
+            return None
+        cached_version, expires_at, body = entry
+        if cached_version != version or expires_at < time.monotonic():
+            self._drop(board_id)
+            return None
+        self._entries.move_to_end(board_id)
+        return body
+
+    async def put(self, board_id, version, body):
+        self._drop(board_id)
+        # A body that alone would take over the cache isn't worth keeping
+        if len(body) > self.max_bytes:
+            return
+        self._entries[board_id] = (version, time.monotonic() + self.ttl, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    async def invalidate(self, board_ids):
+        for board_id in board_ids:
+            self._drop(board_id)
+
+class RedisBoardCache(BoardCache):
+    """
+    Shared cache on any client with redis.asyncio's get/set/delete, so a
+    local stand-in can take the place of a real server.
+    """
+
+    def __init__(self, client, ttl: float = 300.0, prefix: str = "board:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, board_id, version):
+        value = await self.client.get(self.prefix + board_id)
+        if value is None:
+            return None
+        cached_version, _, body = value.partition(b"\n")
+        if cached_version != str(version).encode():
+            return None
+        return body
+
+    async def put(self, board_id, version, body):
+        await self.client.set(self.prefix + board_id, str(version).encode() + b"\n" + body, ex=int(self.ttl))
+
+    async def invalidate(self, board_ids):
+        keys = [self.prefix + board_id for board_id in board_ids]
+        if keys:
+            await self.client.delete(*keys)
+
+def from_env() -> BoardCache:
+    url = os.getenv("BOARD_CACHE_URL", "memory")
+    ttl = float(os.getenv("BOARD_CACHE_TTL", "300"))
+    if url == "off":
+        return NullBoardCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis.asyncio as redis
+        return RedisBoardCache(redis.from_url(url), ttl=ttl)
+    max_bytes = int(float(os.getenv("BOARD_CACHE_MAX_MB", "64")) * 1024 * 1024)
+    return MemoryBoardCache(max_bytes, ttl=ttl)
+
+board_cache = from_env()
+
+@versioning.on_commit
+async def _invalidate_touched(changes: versioning.BoardChanges):
+    await board_cache.invalidate(list(changes.versions))
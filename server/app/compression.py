@@ -0,0 +1,143 @@
+"""
+Response compression.
+
+Board payloads are repetitive JSON and shrink around tenfold, so anything
+textual over a size threshold is compressed: brotli when the client accepts it
+and the `brotli` package is installed, gzip otherwise. Responses that are
+already encoded, partial (206), not textual, event streams (which must reach
+the client as each event is written) or sent through the zerocopysend and
+pathsend extensions pass through untouched.
+
+A compressed body is a different representation, so its ETag is weakened;
+If-None-Match uses the weak comparison, so revalidation still gets a 304.
+"""
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+# Beyond 4-5 brotli gets much slower for little gain on dynamic responses
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+STREAMING_TYPES = ("text/event-stream",)
+
+def _accepted(header: str) -> set:
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=") if params.strip().startswith("q=") else "1"
+        try:
+            if float(quality) > 0:
+                accepted.add(name.strip().lower())
+        except ValueError:
+            continue
+    return accepted
+
+def negotiate(header: str) -> Optional[str]:
+    accepted = _accepted(header)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16+: a gzip header and trailer around the deflate stream
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                # A body sent some other way (zerocopysend, pathsend) can't be
+                # compressed here; release the held start and step aside
+                if compressor is None:
+                    passthrough = True
+                    await send(start)
+                await send(message)
+                return
+            if compressor is not None:
+                body = compressor.compress(message.get("body", b""))
+                more_body = message.get("more_body", False)
+                if not more_body:
+                    body += compressor.finish()
+                if body or not more_body:
+                    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            # First body message: decide for the whole response
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            compressible = content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(STREAMING_TYPES)
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if (
+                not compressible or encoding is None
+                or start["status"] in (204, 206, 304) or "content-encoding" in headers
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressor = _Compressor(encoding)
+            headers["Content-Encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            body = compressor.compress(body)
+            if more_body:
+                del headers["content-length"]
+            else:
+                body += compressor.finish()
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,7 +1,16 @@
-from sqlalchemy import create_engine
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import asyncio
+import itertools
+import math
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,20 +19,244 @@ load_dotenv()
 # Change to PostgreSQL by setting DATABASE_URL in .env
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./trello_clone.db")
 
-# SQLite specific configuration
-if DATABASE_URL.startswith("sqlite"):
+# Async drivers used by the API for each sync driver family
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """Translate a sync database URL into its asyncio driver equivalent"""
+    parsed = make_url(url)
+    backend = parsed.drivername.split("+")[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database '{backend}'")
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    # asyncpg doesn't understand libpq's sslmode, it takes ssl instead
+    if "sslmode" in parsed.query:
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed.render_as_string(hide_password=False)
+
+# The API runs on the async engine; set ASYNC_DATABASE_URL to override the
+# driver mapping (e.g. to point at a pooler that only speaks asyncpg)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Connection pool settings for server databases (PostgreSQL)
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    # Recycle before server or proxy idle timeouts close connections under us
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
+
+# SQLite connection tuning, applied to every new connection
+SQLITE_PRAGMAS = {
+    # Readers don't block the writer or each other, and commits only append
+    "journal_mode": "WAL",
+    # Durable at checkpoints rather than every commit; safe with WAL
+    "synchronous": "NORMAL",
+    # Wait for other processes' locks instead of failing with "database is locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative means KiB rather than pages
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KB", str(64 * 1024))),
+}
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).drivername.startswith("sqlite")
+
+def _is_sqlite_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+def _tune_sqlite(sync_engine, immediate: bool = False):
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+        if immediate:
+            # Let SQLAlchemy issue BEGIN itself, see _begin_immediate
+            dbapi_connection.isolation_level = None
+
+    if immediate:
+        # Take the write lock when the transaction starts: a deferred BEGIN
+        # that reads first can't upgrade to a write once another process has
+        # committed, and fails outright instead of waiting out busy_timeout
+        @event.listens_for(sync_engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+if _is_sqlite(DATABASE_URL):
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False}  # Needed for SQLite
     )
+    _tune_sqlite(engine)
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **POOL_SETTINGS)
 
+def _create_read_engine(url: str):
+    if _is_sqlite(url):
+        read = create_async_engine(
+            url, poolclass=AsyncAdaptedQueuePool,
+            pool_size=POOL_SETTINGS["pool_size"], max_overflow=POOL_SETTINGS["max_overflow"],
+            pool_timeout=POOL_SETTINGS["pool_timeout"],
+        )
+        _tune_sqlite(read.sync_engine)
+        return read
+    return create_async_engine(url, **POOL_SETTINGS)
+
+if _is_sqlite(ASYNC_DATABASE_URL) and not _is_sqlite_memory(ASYNC_DATABASE_URL):
+    # SQLite allows one writer at a time. Sessions that write share a single
+    # connection, so they queue in the pool (for up to DB_POOL_TIMEOUT)
+    # instead of contending for the file lock; reads get their own pool and,
+    # with WAL, never wait on the writer.
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=POOL_SETTINGS["pool_timeout"],
+    )
+    _tune_sqlite(async_engine.sync_engine, immediate=True)
+    read_engine = _create_read_engine(ASYNC_DATABASE_URL)
+elif _is_sqlite(ASYNC_DATABASE_URL):
+    # Each in-memory connection would be its own empty database
+    async_engine = read_engine = create_async_engine(ASYNC_DATABASE_URL)
+else:
+    async_engine = read_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_SETTINGS)
+
+# Sync sessions are kept for tooling (seed.py, init_db.py, alembic) that
+# runs outside the event loop
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+# Objects must stay readable after commit without implicit IO, which an
+# AsyncSession can't do lazily
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# For requests that only read; on SQLite these stay off the writer connection
+ReadSessionLocal = async_sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+class _EagerDefaults:
+    # Fetch server-generated values (created_at, updated_at) with RETURNING in
+    # the INSERT/UPDATE that sets them, so nothing has to be re-read after a
+    # write to build the response
+    __mapper_args__ = {"eager_defaults": True}
+
+Base = declarative_base(cls=_EagerDefaults)
+
+async def get_db(response: Response):
+    # Every handler taking this one writes
+    read_your_writes(response)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
+
+# Read replicas, comma separated, for the hot read endpoints (get_replica_db)
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds between replica health checks, and how long each may take
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "10"))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", "2"))
+# After a write, the client's reads go to the primary for this long, so it
+# doesn't read back its own change from a replica that hasn't applied it yet
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+class ReplicaSet:
+    """Round-robin over the replicas that passed their last health check"""
+
+    def __init__(self, urls):
+        self.engines = [_create_read_engine(to_async_url(url)) for url in urls]
+        self.healthy = set(self.engines)
+        self.sessionmakers = {
+            replica: async_sessionmaker(bind=replica, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            for replica in self.engines
+        }
+        self._turn = itertools.count()
+
+    def pick(self):
+        healthy = [replica for replica in self.engines if replica in self.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def mark_down(self, replica):
+        # Until the next health check brings it back
+        self.healthy.discard(replica)
+
+    async def check(self):
+        for replica in self.engines:
+            try:
+                async with asyncio.timeout(REPLICA_CHECK_TIMEOUT):
+                    async with replica.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+            except (asyncio.TimeoutError, DBAPIError, OSError):
+                self.healthy.discard(replica)
+            else:
+                self.healthy.add(replica)
+
+    async def monitor(self):
+        while True:
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+    async def dispose(self):
+        for replica in self.engines:
+            await replica.dispose()
+
+replicas = ReplicaSet(REPLICA_URLS)
+
+def _reads_own_writes(request: Request) -> bool:
+    until = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+def read_your_writes(response: Response):
+    """Send this client's reads to the primary for the next few seconds"""
+    if not replicas.engines:
+        return
+    until = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+    response.headers[READ_PRIMARY_HEADER] = until
+    response.set_cookie(
+        READ_PRIMARY_COOKIE, until, max_age=math.ceil(READ_YOUR_WRITES_SECONDS),
+        httponly=True, samesite="lax",
+    )
+
+async def get_replica_db(request: Request):
+    """A read-only session on a healthy replica, or the primary if there's none or the client just wrote"""
+    replica = None if _reads_own_writes(request) else replicas.pick()
+    if replica is None:
+        async with ReadSessionLocal() as db:
+            yield db
+        return
+    async with replicas.sessionmakers[replica]() as db:
+        try:
+            yield db
+        except DBAPIError as e:
+            if e.connection_invalidated or isinstance(e, OperationalError):
+                replicas.mark_down(replica)
+            raise
 
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
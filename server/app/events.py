@@ -0,0 +1,106 @@
+"""
+Live board events.
+
+Routers describe what they changed with `emit(db, type, **data)`. Once the
+transaction commits, each event goes to everyone subscribed to the boards it
+touched, tagged with the board's new version so a client can tell when it
+missed something and should refetch.
+
+Events travel through a broker: in-process by default, or Redis pub/sub when
+several workers serve the same boards (BOARD_EVENTS_URL=redis://...).
+"""
+import asyncio
+import json
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from fastapi.encoders import jsonable_encoder
+from app import versioning
+
+# Sent instead of events a subscriber was too slow to take; refetch the board
+RESYNC = "resync"
+
+def emit(db, type: str, **data):
+    """Queue an event for the boards this transaction touches"""
+    versioning.changes(db).events.append((type, data))
+
+class Broker:
+    async def publish(self, board_id: str, event: dict):
+        raise NotImplementedError
+
+    def subscribe(self, board_id: str):
+        """Async context manager yielding an async iterator of events"""
+        raise NotImplementedError
+
+class MemoryBroker(Broker):
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._queues = defaultdict(set)
+
+    async def publish(self, board_id, event):
+        for queue in list(self._queues.get(board_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Don't buffer without bound for a stalled client
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": RESYNC, "boardId": board_id})
+
+    @asynccontextmanager
+    async def subscribe(self, board_id):
+        queue = asyncio.Queue(self.queue_size)
+        self._queues[board_id].add(queue)
+
+        async def events():
+            while True:
+                yield await queue.get()
+
+        try:
+            yield events()
+        finally:
+            self._queues[board_id].discard(queue)
+            if not self._queues[board_id]:
+                del self._queues[board_id]
+
+class RedisBroker(Broker):
+    """Pub/sub through any client with redis.asyncio's publish/pubsub"""
+
+    def __init__(self, client, prefix: str = "board-events:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def publish(self, board_id, event):
+        await self.client.publish(self.prefix + board_id, json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self, board_id):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.prefix + board_id)
+
+        async def events():
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+
+        try:
+            yield events()
+        finally:
+            await pubsub.unsubscribe(self.prefix + board_id)
+            await pubsub.close()
+
+def from_env() -> Broker:
+    url = os.getenv("BOARD_EVENTS_URL", "memory")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis.asyncio as redis
+        return RedisBroker(redis.from_url(url))
+    return MemoryBroker()
+
+broker = from_env()
+
+@versioning.on_commit
+async def _publish(changes: versioning.BoardChanges):
+    for board_id, version in changes.versions.items():
+        for type, data in changes.events:
+            event = {"type": type, "boardId": board_id, "version": version, "data": data}
+            await broker.publish(board_id, jsonable_encoder(event))
@@ -0,0 +1,66 @@
+"""
+Loader profiles: the relationships each endpoint serializes, and how to fetch them.
+
+Relationships on the models are lazy="raise_on_sql", so serializing something
+a profile didn't load fails loudly instead of issuing one query per row.
+Collections use selectinload (one SELECT ... IN per collection, so row counts
+stay linear and LIMIT applies to the parent); many-to-one hops use joinedload.
+
+Writes load what they'll return before changing it, or, for rows they just
+inserted, mark the relationships known with `known()`, so responses are built
+without re-reading anything after the commit.
+"""
+from sqlalchemy.orm import Load, joinedload, selectinload, with_loader_criteria
+from sqlalchemy.orm.attributes import set_committed_value
+from app import models
+
+def _card_collections(card):
+    # Everything schemas.Card nests, below a loader path that ends at Card.
+    # Comments aren't among them: a card can collect thousands, so they're
+    # paged through GET /api/cards/{id}/comments instead
+    return (
+        card.selectinload(models.Card.labels).joinedload(models.CardLabel.label),
+        card.selectinload(models.Card.members).joinedload(models.CardMember.user),
+        card.selectinload(models.Card.checklists).selectinload(models.Checklist.items),
+        card.selectinload(models.Card.attachments),
+    )
+
+def _card_summaries(card):
+    # What schemas.CardInList needs: label and member ids, plus the cover
+    # thumbnail (deferred); badge counts are columns on the card
+    return (
+        card.selectinload(models.Card.labels),
+        card.selectinload(models.Card.members),
+        card.undefer(models.Card.cover_thumbnail),
+    )
+
+def _live_cards():
+    # Archived cards stay out of board and list views, see app/archive.py
+    return with_loader_criteria(models.Card, models.Card.archived_at.is_(None))
+
+def board_tree():
+    return (*_card_summaries(selectinload(models.Board.lists).selectinload(models.List.cards)), _live_cards())
+
+def list_tree():
+    return (*_card_summaries(selectinload(models.List.cards)), _live_cards())
+
+def card_summary():
+    return _card_summaries(Load(models.Card))
+
+def card_detail():
+    return (joinedload(models.Card.list), *_card_collections(Load(models.Card)))
+
+def checklist():
+    return (selectinload(models.Checklist.items),)
+
+def comment():
+    return (joinedload(models.Comment.user),)
+
+def known(obj, **relationships):
+    """Mark relationships as loaded with values the caller already has"""
+    for key, value in relationships.items():
+        set_committed_value(obj, key, value)
+    return obj
+
+def new_card(card, card_list):
+    return known(card, list=card_list, labels=[], members=[], checklists=[], attachments=[])
@@ -1,13 +1,10 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, ForeignKey, Text, Index, LargeBinary, select
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from app.database import Base
-import uuid
+from app.ids import ID, generate_id
 import os
 
-def generate_uuid():
-    return str(uuid.uuid4())
-
 # SQLite doesn't support timezone-aware datetimes, so we use a workaround
 from dotenv import load_dotenv
 load_dotenv()
@@ -20,144 +17,281 @@ else:
     from sqlalchemy import DateTime as DateTimeType
     DateTime = DateTimeType(timezone=True)
 
+# Every relationship is lazy="raise_on_sql": anything a request needs must be
+# loaded up front with a profile from app/loaders.py
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_name", "name"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)
     avatar = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    card_assignments = relationship("CardMember", back_populates="user", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
+    card_assignments = relationship("CardMember", back_populates="user", cascade="all, delete-orphan", lazy="raise_on_sql")
+    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan", lazy="raise_on_sql")
 
 class Board(Base):
     __tablename__ = "boards"
+    __table_args__ = (
+        Index("ix_boards_created_at", "created_at"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     background = Column(String, default="#0079bf")
+    # Bumped by every write to the board or its contents, see app/versioning.py
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    lists = relationship("List", back_populates="board", cascade="all, delete-orphan", order_by="List.position")
+    lists = relationship("List", back_populates="board", cascade="all, delete-orphan", order_by="List.position", lazy="raise_on_sql")
 
 class List(Base):
     __tablename__ = "lists"
+    __table_args__ = (
+        Index("ix_lists_board_id_position", "board_id", "position"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     title = Column(String, nullable=False)
-    position = Column(Integer, nullable=False)
-    board_id = Column(String, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
+    # Fractional rank key, see app/ranking.py
+    position = Column(Float, nullable=False)
+    board_id = Column(ID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    board = relationship("Board", back_populates="lists")
-    cards = relationship("Card", back_populates="list", cascade="all, delete-orphan", order_by="Card.position")
+    board = relationship("Board", back_populates="lists", lazy="raise_on_sql")
+    cards = relationship("Card", back_populates="list", cascade="all, delete-orphan", order_by="Card.position", lazy="raise_on_sql")
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        Index("ix_cards_list_id_position", "list_id", "position"),
+        Index("ix_cards_created_at", "created_at"),
+        Index("ix_cards_archived_at", "archived_at"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    position = Column(Integer, nullable=False)
+    # Fractional rank key, see app/ranking.py
+    position = Column(Float, nullable=False)
     cover_image = Column(String, nullable=True)
     due_date = Column(DateTime, nullable=True)
-    list_id = Column(String, ForeignKey("lists.id", ondelete="CASCADE"), nullable=False)
+    list_id = Column(ID, ForeignKey("lists.id", ondelete="CASCADE"), nullable=False)
+    # Badge counters, maintained by the writes to the child rows, see app/badges.py
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    attachment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    checklist_total = Column(Integer, nullable=False, default=0, server_default="0")
+    checklist_done = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set while the card is archived but not yet moved to card_archives, see app/archive.py
+    archived_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    list = relationship("List", back_populates="cards")
-    labels = relationship("CardLabel", back_populates="card", cascade="all, delete-orphan")
-    members = relationship("CardMember", back_populates="card", cascade="all, delete-orphan")
-    checklists = relationship("Checklist", back_populates="card", cascade="all, delete-orphan", order_by="Checklist.position")
-    attachments = relationship("Attachment", back_populates="card", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="card", cascade="all, delete-orphan", order_by="Comment.created_at.desc()")
+    list = relationship("List", back_populates="cards", lazy="raise_on_sql")
+    labels = relationship("CardLabel", back_populates="card", cascade="all, delete-orphan", lazy="raise_on_sql")
+    members = relationship("CardMember", back_populates="card", cascade="all, delete-orphan", lazy="raise_on_sql")
+    checklists = relationship("Checklist", back_populates="card", cascade="all, delete-orphan", order_by="Checklist.position", lazy="raise_on_sql")
+    attachments = relationship("Attachment", back_populates="card", cascade="all, delete-orphan", lazy="raise_on_sql")
+    comments = relationship("Comment", back_populates="card", cascade="all, delete-orphan", order_by="Comment.created_at.desc()", lazy="raise_on_sql")
+
+    # Compact board-view fields, see schemas.CardInList
+    @property
+    def label_ids(self):
+        return [card_label.label_id for card_label in self.labels]
+
+    @property
+    def member_ids(self):
+        return [card_member.user_id for card_member in self.members]
+
+    @property
+    def badges(self):
+        return {
+            "comments": self.comment_count,
+            "attachments": self.attachment_count,
+            "checklist_items": self.checklist_total,
+            "checklist_items_completed": self.checklist_done,
+        }
 
 class Label(Base):
     __tablename__ = "labels"
+    __table_args__ = (
+        Index("ix_labels_board_id_created_at", "board_id", "created_at"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     name = Column(String, nullable=False)
     color = Column(String, nullable=False)
-    board_id = Column(String, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
+    board_id = Column(ID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    cards = relationship("CardLabel", back_populates="label", cascade="all, delete-orphan")
+    cards = relationship("CardLabel", back_populates="label", cascade="all, delete-orphan", lazy="raise_on_sql")
 
 class CardLabel(Base):
     __tablename__ = "card_labels"
+    __table_args__ = (
+        Index("uq_card_labels_card_id_label_id", "card_id", "label_id", unique=True),
+        Index("ix_card_labels_label_id", "label_id"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    card_id = Column(String, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
-    label_id = Column(String, ForeignKey("labels.id", ondelete="CASCADE"), nullable=False)
+    id = Column(ID, primary_key=True, default=generate_id)
+    card_id = Column(ID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    label_id = Column(ID, ForeignKey("labels.id", ondelete="CASCADE"), nullable=False)
     
-    card = relationship("Card", back_populates="labels")
-    label = relationship("Label", back_populates="cards")
+    card = relationship("Card", back_populates="labels", lazy="raise_on_sql")
+    label = relationship("Label", back_populates="cards", lazy="raise_on_sql")
 
 class CardMember(Base):
     __tablename__ = "card_members"
+    __table_args__ = (
+        Index("uq_card_members_card_id_user_id", "card_id", "user_id", unique=True),
+        Index("ix_card_members_user_id", "user_id"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    card_id = Column(String, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(ID, primary_key=True, default=generate_id)
+    card_id = Column(ID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
-    card = relationship("Card", back_populates="members")
-    user = relationship("User", back_populates="card_assignments")
+    card = relationship("Card", back_populates="members", lazy="raise_on_sql")
+    user = relationship("User", back_populates="card_assignments", lazy="raise_on_sql")
 
 class Checklist(Base):
     __tablename__ = "checklists"
+    __table_args__ = (
+        Index("ix_checklists_card_id_position", "card_id", "position"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     title = Column(String, nullable=False)
-    card_id = Column(String, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    card_id = Column(ID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
     position = Column(Integer, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    card = relationship("Card", back_populates="checklists")
-    items = relationship("ChecklistItem", back_populates="checklist", cascade="all, delete-orphan", order_by="ChecklistItem.position")
+    card = relationship("Card", back_populates="checklists", lazy="raise_on_sql")
+    items = relationship("ChecklistItem", back_populates="checklist", cascade="all, delete-orphan", order_by="ChecklistItem.position", lazy="raise_on_sql")
 
 class ChecklistItem(Base):
     __tablename__ = "checklist_items"
+    __table_args__ = (
+        Index("ix_checklist_items_checklist_id_position", "checklist_id", "position"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     text = Column(String, nullable=False)
     is_completed = Column(Boolean, default=False)
     position = Column(Integer, nullable=False)
-    checklist_id = Column(String, ForeignKey("checklists.id", ondelete="CASCADE"), nullable=False)
+    checklist_id = Column(ID, ForeignKey("checklists.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    checklist = relationship("Checklist", back_populates="items")
+    checklist = relationship("Checklist", back_populates="items", lazy="raise_on_sql")
+
+class Blob(Base):
+    """A stored file, shared by every attachment with the same content, see app/storage.py"""
+    __tablename__ = "blobs"
+
+    key = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
 
 class Attachment(Base):
     __tablename__ = "attachments"
+    __table_args__ = (
+        Index("ix_attachments_card_id_created_at", "card_id", "created_at"),
+        Index("ix_attachments_blob_key", "blob_key"),
+        Index("ix_attachments_url", "url"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     name = Column(String, nullable=False)
     url = Column(String, nullable=False)
     type = Column(String, nullable=False)
     size = Column(Integer, nullable=True)
-    card_id = Column(String, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    # Null for files uploaded before content-addressed storage
+    blob_key = Column(String, ForeignKey("blobs.key"), nullable=True)
+    # Downscaled copies of images, once rendered, see app/thumbnails.py
+    thumbnail_url = Column(String, nullable=True)
+    preview_url = Column(String, nullable=True)
+    card_id = Column(ID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     
-    card = relationship("Card", back_populates="attachments")
+    card = relationship("Card", back_populates="attachments", lazy="raise_on_sql")
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_card_id_created_at", "card_id", "created_at"),
+        Index("ix_comments_user_id", "user_id"),
+    )
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(ID, primary_key=True, default=generate_id)
     text = Column(Text, nullable=False)
-    card_id = Column(String, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    card_id = Column(ID, ForeignKey("cards.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
-    card = relationship("Card", back_populates="comments")
-    user = relationship("User", back_populates="comments")
+    card = relationship("Card", back_populates="comments", lazy="raise_on_sql")
+    user = relationship("User", back_populates="comments", lazy="raise_on_sql")
+
+class CardArchive(Base):
+    """An archived card moved out of the live tables, with its details compressed, see app/archive.py"""
+    __tablename__ = "card_archives"
+    __table_args__ = (
+        Index("ix_card_archives_board_id_archived_at", "board_id", "archived_at"),
+    )
+
+    # The card's own id, kept so restoring it changes no links
+    id = Column(ID, primary_key=True)
+    board_id = Column(ID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
+    # Where it was; the list may be gone by the time it's restored
+    list_id = Column(ID, nullable=False)
+    title = Column(String, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+    moved_at = Column(DateTime, server_default=func.now())
+    payload = Column(LargeBinary, nullable=False)
+
+class CardArchiveBlob(Base):
+    """Keeps the files of an archived card's attachments from being collected"""
+    __tablename__ = "card_archive_blobs"
+    __table_args__ = (
+        Index("ix_card_archive_blobs_blob_key", "blob_key"),
+    )
+
+    card_id = Column(ID, ForeignKey("card_archives.id", ondelete="CASCADE"), primary_key=True)
+    blob_key = Column(String, ForeignKey("blobs.key"), primary_key=True)
+
+class BoardChange(Base):
+    """One entity changed by the write that took its board to `version`"""
+    __tablename__ = "board_changes"
+    __table_args__ = (
+        Index("ix_board_changes_board_id_version", "board_id", "version"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    board_id = Column(ID, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)
+    entity_id = Column(ID, nullable=False)
+    op = Column(String, nullable=False)
+
+# The board view shows covers at thumbnail size when the cover is an
+# attachment that has one
+Card.cover_thumbnail = column_property(
+    select(Attachment.thumbnail_url)
+    .where(Attachment.url == Card.cover_image, Attachment.thumbnail_url.is_not(None))
+    .limit(1)
+    .scalar_subquery(),
+    deferred=True, raiseload=True,
+)
@@ -0,0 +1,85 @@
+"""
+Keyset pagination.
+
+A page is ordered on a fixed tuple of sort keys ending in a unique id. The
+cursor handed back to the client is the sort key of the last row served, so
+the next page starts with an indexed range scan from that point instead of
+an OFFSET that reads and discards every earlier row.
+
+List endpoints keep returning a plain JSON array; the cursor for the next
+page, if there is one, travels in the X-Next-Cursor response header.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, and_, literal, or_
+from sqlalchemy.dialects import sqlite
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Maximum number of items to return"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+def asc(column):
+    return (column, False)
+
+def desc(column):
+    return (column, True)
+
+def encode_cursor(values) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, keys) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(keys):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for (column, _), value in zip(keys, payload)
+        ]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _bind(column, value):
+    if isinstance(column.type, DateTime):
+        # server_default timestamps are stored by SQLite as 'YYYY-MM-DD HH:MM:SS'
+        # text; bind the cursor in the same format so equal values compare equal
+        return literal(value, column.type.with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"))
+    return literal(value, column.type)
+
+def _after(keys, values):
+    # (a, b, c) > (x, y, z) spelled out so mixed sort directions work everywhere
+    clauses = []
+    for index, (column, descending) in enumerate(keys):
+        bound = _bind(column, values[index])
+        earlier = [keys[i][0] == _bind(keys[i][0], values[i]) for i in range(index)]
+        clauses.append(and_(*earlier, column < bound if descending else column > bound))
+    return or_(*clauses)
+
+def paginate(stmt, page: PageParams, *keys):
+    """Order stmt by keys, skip past page.cursor and fetch one row beyond the page"""
+    if page.cursor:
+        stmt = stmt.where(_after(keys, decode_cursor(page.cursor, keys)))
+    return stmt.order_by(
+        *(column.desc() if descending else column.asc() for column, descending in keys)
+    ).limit(page.limit + 1)
+
+def finish(rows, page: PageParams, response: Response, key):
+    """Trim the look-ahead row and advertise the next cursor if there is more"""
+    rows = list(rows)
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
@@ -0,0 +1,106 @@
+"""
+Fractional position keys for lists and cards.
+
+Positions are floats spaced POSITION_STEP apart. Moving an item writes a key
+halfway between its new neighbours, so a move touches exactly one row. When
+repeated moves into the same gap make keys too close together, the parent is
+renumbered back to evenly spaced keys. A renumber is a write like any other:
+it bumps the board's version and logs every item it rekeyed, so ETags, the
+board cache and delta clients all see the new keys.
+"""
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.ids import case_by_id
+from app import events, versioning
+
+POSITION_STEP = 1024.0
+
+# Gaps smaller than this still work but are worth spreading out again
+REBALANCE_GAP = 1e-3
+
+def key_between(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    """Return a key strictly between two neighbours, or None if there's no room left"""
+    if before is None and after is None:
+        return 0.0
+    if before is None:
+        return after - POSITION_STEP
+    if after is None:
+        return before + POSITION_STEP
+    key = (before + after) / 2
+    if not before < key < after:
+        return None
+    return key
+
+def is_crowded(before: Optional[float], after: Optional[float]) -> bool:
+    return before is not None and after is not None and after - before < REBALANCE_GAP
+
+async def neighbour_positions(db: AsyncSession, model, parent_column, parent_id, index: int, exclude_id: Optional[str] = None):
+    """Positions of the items that would surround a new item at `index`"""
+    criteria = [parent_column == parent_id]
+    if exclude_id is not None:
+        criteria.append(model.id != exclude_id)
+    stmt = select(model.position).where(*criteria).order_by(model.position.asc())
+
+    if index <= 0:
+        return None, await db.scalar(stmt.limit(1))
+
+    rows = (await db.scalars(stmt.offset(index - 1).limit(2))).all()
+    if not rows:
+        # Past the end: append after the last item
+        return await db.scalar(select(func.max(model.position)).where(*criteria)), None
+    return rows[0], rows[1] if len(rows) > 1 else None
+
+def append_position(model, parent_column, parent_id, step: float = POSITION_STEP):
+    """
+    SQL for the key after the last item under a parent, to embed in the INSERT
+    itself rather than reading max(position) first
+    """
+    return (
+        select(func.coalesce(func.max(model.position) + step, 0))
+        .where(parent_column == parent_id)
+        .scalar_subquery()
+    )
+
+async def rebalance(db: AsyncSession, model, parent_column, parent_id, board_id: str):
+    """Renumber every item under a parent to evenly spaced keys in one UPDATE"""
+    ids = (await db.scalars(
+        select(model.id).where(parent_column == parent_id).order_by(model.position.asc(), model.id.asc())
+    )).all()
+    if not ids:
+        return
+
+    positions = {item_id: index * POSITION_STEP for index, item_id in enumerate(ids)}
+    await db.execute(
+        update(model)
+        .where(model.id.in_(positions))
+        .values(position=case_by_id(model.id, positions)),
+        execution_options={"synchronize_session": False},
+    )
+    entity = model.__name__.lower()
+    await versioning.touch(db, board_id)
+    versioning.record(db, entity, *ids)
+    events.emit(db, f"{entity}s.rebalanced", positions=positions)
+
+async def rebalance_in_background(model, parent_column, parent_id, board_id: str):
+    async with AsyncSessionLocal() as db:
+        await rebalance(db, model, parent_column, parent_id, board_id)
+        await db.commit()
+
+async def position_at(db: AsyncSession, model, parent_column, parent_id, board_id: str, index: int, exclude_id: Optional[str] = None, background_tasks=None) -> float:
+    """
+    Compute the key for an item placed at `index` under a parent on `board_id`.
+
+    Renumbers the parent first if the target gap is exhausted, and schedules a
+    background renumber when it's merely getting tight.
+    """
+    before, after = await neighbour_positions(db, model, parent_column, parent_id, index, exclude_id)
+    key = key_between(before, after)
+    if key is None:
+        await rebalance(db, model, parent_column, parent_id, board_id)
+        before, after = await neighbour_positions(db, model, parent_column, parent_id, index, exclude_id)
+        key = key_between(before, after)
+    elif background_tasks is not None and is_crowded(before, after):
+        background_tasks.add_task(rebalance_in_background, model, parent_column, parent_id, board_id)
+    return key
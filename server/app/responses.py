@@ -0,0 +1,22 @@
+"""
+Default response class for the API.
+
+Routes with a response_model arrive here already dumped to JSON-ready values
+by their schema, camelCase aliases and all; orjson turns those into bytes
+several times faster than the standard json module. Pydantic models returned
+directly are dumped by pydantic's own serializer in one step.
+"""
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class APIResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(by_alias=True).encode()
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,94 @@
+"""
+POST /api/batch: several card, list and label writes in one transaction.
+
+Each operation names an existing route by method and path, with the JSON body
+that route takes. They run in order on one session whose commits only flush,
+so the batch costs a single commit and lands all-or-nothing: the first
+operation to fail rolls everything back and the error says which one it was.
+"""
+import inspect
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal, read_your_writes
+from app import schemas
+from app.routers import cards, labels, lists
+
+router = APIRouter()
+
+# Path prefix (as mounted under /api) -> router whose writes may be batched
+BATCHABLE = {"/cards": cards.router, "/lists": lists.router, "/labels": labels.router}
+
+class BatchSession(AsyncSession):
+    """Session shared by a batch's operations; their commits only flush"""
+
+    async def commit(self):
+        await self.flush()
+
+    async def commit_batch(self):
+        await super().commit()
+
+def _resolve(method: str, path: str):
+    path = "/" + path.strip("/").removeprefix("api/")
+    for prefix, prefix_router in BATCHABLE.items():
+        if path != prefix and not path.startswith(prefix + "/"):
+            continue
+        # Routes are declared relative to their prefix, and "/" for the root
+        rest = path[len(prefix):] or "/"
+        for route in prefix_router.routes:
+            if not isinstance(route, APIRoute) or method not in route.methods:
+                continue
+            match = route.path_regex.match(rest) or route.path_regex.match(rest + "/")
+            if match:
+                return route, match.groupdict()
+    raise HTTPException(status_code=404, detail=f"No batchable route for {method} {path}")
+
+def _arguments(route: APIRoute, path_params: dict, body, db, background_tasks):
+    kwargs = {}
+    for name, param in inspect.signature(route.endpoint).parameters.items():
+        annotation = param.annotation
+        if name in path_params:
+            kwargs[name] = path_params[name]
+        elif annotation is AsyncSession:
+            kwargs[name] = db
+        elif annotation is BackgroundTasks:
+            kwargs[name] = background_tasks
+        elif annotation is dict:
+            kwargs[name] = body or {}
+        elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+            kwargs[name] = annotation.model_validate(body or {})
+        else:
+            # Uploads, pagination, raw requests: not expressible as a JSON op
+            raise HTTPException(status_code=400, detail=f"{route.name} can't be batched")
+    return kwargs
+
+def _serialize(route: APIRoute, result):
+    if route.response_model is None:
+        return jsonable_encoder(result)
+    adapter = TypeAdapter(route.response_model)
+    return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json", by_alias=True)
+
+async def _apply(db, operation: schemas.BatchOperation, background_tasks: BackgroundTasks):
+    route, path_params = _resolve(operation.method, operation.path)
+    try:
+        kwargs = _arguments(route, path_params, operation.body, db, background_tasks)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    result = await route.endpoint(**kwargs)
+    return {"status": route.status_code or 200, "body": _serialize(route, result)}
+
+@router.post("", response_model=schemas.BatchResult)
+async def run_batch(batch: schemas.BatchRequest, background_tasks: BackgroundTasks, response: Response):
+    read_your_writes(response)
+    async with BatchSession(**AsyncSessionLocal.kw) as db:
+        results = []
+        for index, operation in enumerate(batch.operations):
+            try:
+                results.append(await _apply(db, operation, background_tasks))
+            except HTTPException as e:
+                await db.rollback()
+                raise HTTPException(status_code=e.status_code, detail={"index": index, "detail": e.detail})
+        await db.commit_batch()
+    return {"results": results}
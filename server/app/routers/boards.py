@@ -1,95 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, get_read_db, get_replica_db
+from app import archive, events, loaders, models, schemas, storage, versioning
+from app.board_cache import board_cache
+from app.pagination import PageParams, desc, finish, paginate
+from app.search_index import search_index
 
 router = APIRouter()
 
+async def _load_board(db: AsyncSession, board_id: str):
+    result = await db.execute(
+        select(models.Board)
+        .options(*loaders.board_tree())
+        .filter(models.Board.id == board_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 @router.get("/", response_model=List[schemas.Board])
-async def get_boards(db: Session = Depends(get_db)):
-    boards = db.query(models.Board).options(
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.labels)
-        .joinedload(models.CardLabel.label),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.members)
-        .joinedload(models.CardMember.user),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.checklists)
-        .joinedload(models.Checklist.items),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.attachments),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.comments)
-        .joinedload(models.Comment.user),
-    ).order_by(models.Board.created_at.desc()).all()
-    return boards
+async def get_boards(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_replica_db)):
+    result = await db.execute(paginate(
+        select(models.Board).options(*loaders.board_tree()),
+        page, desc(models.Board.created_at), desc(models.Board.id),
+    ))
+    return finish(result.scalars(), page, response, lambda board: (board.created_at, board.id))
+
+@router.get("/summary", response_model=List[schemas.BoardSummary])
+async def get_board_summaries(db: AsyncSession = Depends(get_read_db)):
+    list_counts = (
+        select(models.List.board_id, func.count(models.List.id).label("list_count"))
+        .group_by(models.List.board_id)
+        .subquery()
+    )
+    card_counts = (
+        select(models.List.board_id, func.count(models.Card.id).label("card_count"))
+        .join(models.Card, models.Card.list_id == models.List.id)
+        .where(models.Card.archived_at.is_(None))
+        .group_by(models.List.board_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            models.Board.id,
+            models.Board.title,
+            models.Board.description,
+            models.Board.background,
+            models.Board.created_at,
+            models.Board.updated_at,
+            func.coalesce(list_counts.c.list_count, 0).label("list_count"),
+            func.coalesce(card_counts.c.card_count, 0).label("card_count"),
+        )
+        .outerjoin(list_counts, list_counts.c.board_id == models.Board.id)
+        .outerjoin(card_counts, card_counts.c.board_id == models.Board.id)
+        .order_by(models.Board.created_at.desc())
+    )
+    return result.mappings().all()
 
 @router.get("/{board_id}", response_model=schemas.Board)
-async def get_board(board_id: str, db: Session = Depends(get_db)):
-    board = db.query(models.Board).options(
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.labels)
-        .joinedload(models.CardLabel.label),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.members)
-        .joinedload(models.CardMember.user),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.checklists)
-        .joinedload(models.Checklist.items),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.attachments),
-        joinedload(models.Board.lists)
-        .joinedload(models.List.cards)
-        .joinedload(models.Card.comments)
-        .joinedload(models.Comment.user),
-    ).filter(models.Board.id == board_id).first()
-    if not board:
+async def get_board(board_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_replica_db)):
+    # Read the version before the tree so the ETag is never newer than the body
+    version = await db.scalar(select(models.Board.version).where(models.Board.id == board_id))
+    if version is None:
         raise HTTPException(status_code=404, detail="Board not found")
-    return board
+    tag = versioning.etag("board", board_id, version)
+    not_modified = versioning.conditional(request, response, tag)
+    if not_modified:
+        return not_modified
+
+    headers = {"ETag": tag, "Cache-Control": versioning.CACHE_CONTROL}
+    body = await board_cache.get(board_id, version)
+    if body is None:
+        board = await _load_board(db, board_id)
+        if not board:
+            raise HTTPException(status_code=404, detail="Board not found")
+        body = schemas.Board.model_validate(board).model_dump_json(by_alias=True).encode()
+        await board_cache.put(board_id, version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Change log entity -> BoardDelta field
+_DELTA_COLLECTIONS = {"list": "lists", "card": "cards", "label": "labels"}
+
+@router.get("/{board_id}/changes", response_model=schemas.BoardDelta)
+async def get_board_changes(
+    board_id: str,
+    since: int = Query(..., ge=0, description="Board version the client already has"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    version = await db.scalar(select(models.Board.version).where(models.Board.id == board_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    delta = {"version": version, "since": since}
+    if since >= version:
+        # A version from the future means the client's copy isn't this board's
+        return {**delta, "resync": since > version}
+
+    # Cap at the version just read so a concurrent write can't leak in half-seen
+    log = await db.execute(
+        select(models.BoardChange.version, models.BoardChange.entity, models.BoardChange.entity_id, models.BoardChange.op)
+        .where(models.BoardChange.board_id == board_id)
+        .where(models.BoardChange.version > since, models.BoardChange.version <= version)
+        .order_by(models.BoardChange.version, models.BoardChange.id)
+    )
+    entries = log.all()
+    if not entries or entries[0].version != since + 1:
+        # Pruned, or from before the log existed
+        return {**delta, "resync": True}
+
+    # Later entries win, so a card edited then deleted is just a tombstone
+    latest = {(entry.entity, entry.entity_id): entry.op for entry in entries}
+    changed = {"board": set(), **{entity: set() for entity in _DELTA_COLLECTIONS}}
+    deleted = {entity: set() for entity in _DELTA_COLLECTIONS}
+    for (entity, entity_id), op in latest.items():
+        (deleted if op == versioning.DELETE else changed)[entity].add(entity_id)
+
+    if changed["board"]:
+        delta["board"] = await db.get(models.Board, board_id)
+    if changed["list"]:
+        delta["lists"] = (await db.scalars(
+            select(models.List)
+            .where(models.List.id.in_(changed["list"]), models.List.board_id == board_id)
+        )).all()
+    if changed["card"]:
+        delta["cards"] = (await db.scalars(
+            select(models.Card)
+            .options(*loaders.card_summary())
+            .join(models.List)
+            .where(models.Card.id.in_(changed["card"]), models.List.board_id == board_id)
+            .where(models.Card.archived_at.is_(None))
+        )).all()
+    if changed["label"]:
+        delta["labels"] = (await db.scalars(
+            select(models.Label)
+            .where(models.Label.id.in_(changed["label"]), models.Label.board_id == board_id)
+        )).all()
+
+    # Whatever was logged but is no longer on this board (deleted since,
+    # archived, or moved to another board) goes out as a tombstone too
+    for entity, key in _DELTA_COLLECTIONS.items():
+        deleted[entity] |= changed[entity] - {row.id for row in delta.get(key, ())}
+    delta["deleted"] = {key: sorted(deleted[entity]) for entity, key in _DELTA_COLLECTIONS.items()}
+    return delta
+
+@router.get("/{board_id}/archive", response_model=List[schemas.ArchivedCard])
+async def get_archived_cards(board_id: str, response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_read_db)):
+    # Most recently archived first, whether or not they've been moved yet
+    archived = archive.listing(board_id)
+    result = await db.execute(paginate(
+        select(archived), page, desc(archived.c.archived_at), desc(archived.c.id),
+    ))
+    return finish(result.all(), page, response, lambda card: (card.archived_at, card.id))
 
 @router.post("/", response_model=schemas.Board, status_code=201)
-async def create_board(board: schemas.BoardCreate, db: Session = Depends(get_db)):
+async def create_board(board: schemas.BoardCreate, db: AsyncSession = Depends(get_db)):
     try:
         db_board = models.Board(**board.dict())
         db.add(db_board)
-        db.commit()
-        db.refresh(db_board)
-        return db_board
+        await db.commit()
+        return loaders.known(db_board, lists=[])
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create board: {str(e)}")
 
 @router.put("/{board_id}", response_model=schemas.Board)
-async def update_board(board_id: str, board_update: schemas.BoardUpdate, db: Session = Depends(get_db)):
-    db_board = db.query(models.Board).filter(models.Board.id == board_id).first()
+async def update_board(board_id: str, board_update: schemas.BoardUpdate, db: AsyncSession = Depends(get_db)):
+    db_board = await _load_board(db, board_id)
     if not db_board:
         raise HTTPException(status_code=404, detail="Board not found")
-    
+
     update_data = board_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_board, field, value)
-    
-    db.commit()
-    db.refresh(db_board)
+
+    await versioning.touch(db, board_id)
+    versioning.record(db, "board", board_id)
+    events.emit(db, "board.updated", **update_data)
+    await db.commit()
     return db_board
 
 @router.delete("/{board_id}")
-async def delete_board(board_id: str, db: Session = Depends(get_db)):
-    db_board = db.query(models.Board).filter(models.Board.id == board_id).first()
+async def delete_board(board_id: str, db: AsyncSession = Depends(get_db)):
+    db_board = await db.get(models.Board, board_id)
     if not db_board:
         raise HTTPException(status_code=404, detail="Board not found")
-    
-    db.delete(db_board)
-    db.commit()
+
+    await search_index.remove_cards(
+        db,
+        select(models.Card.id).join(models.List).filter(models.List.board_id == board_id),
+    )
+    await versioning.touch(db, board_id)
+    events.emit(db, "board.deleted")
+    await db.execute(delete(models.BoardChange).where(models.BoardChange.board_id == board_id))
+    await storage.release(
+        db,
+        select(models.Attachment.blob_key).join(models.Card).join(models.List).filter(models.List.board_id == board_id),
+    )
+    archived_cards = select(models.CardArchive.id).where(models.CardArchive.board_id == board_id)
+    await storage.release(
+        db,
+        select(models.CardArchiveBlob.blob_key).where(models.CardArchiveBlob.card_id.in_(archived_cards)),
+    )
+    await db.execute(delete(models.CardArchiveBlob).where(models.CardArchiveBlob.card_id.in_(archived_cards)))
+    await db.execute(delete(models.CardArchive).where(models.CardArchive.board_id == board_id))
+    await db.delete(db_board)
+    await db.commit()
     return {"message": "Board deleted successfully"}
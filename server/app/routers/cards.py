@@ -1,201 +1,383 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
-from datetime import datetime
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, get_read_db, get_replica_db
+from app.ids import case_by_id
+from app import archive, badges, events, loaders, models, ranking, schemas, storage, thumbnails, uploads, versioning
+from app.pagination import PageParams, desc, finish, paginate
+from app.search_index import CHECKLIST_ITEM, COMMENT, search_index
 
 router = APIRouter()
 
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+ALLOWED_TYPES = {
+    'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'application/pdf',
+    'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain',
+}
+
+def _remove_upload(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def _load_card(db: AsyncSession, card_id: str):
+    result = await db.execute(
+        select(models.Card)
+        .options(*loaders.card_detail())
+        .filter(models.Card.id == card_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def _load_checklist(db: AsyncSession, checklist_id: str):
+    result = await db.execute(
+        select(models.Checklist)
+        .options(*loaders.checklist())
+        .filter(models.Checklist.id == checklist_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def _load_comment(db: AsyncSession, comment_id: str):
+    return await db.scalar(
+        select(models.Comment)
+        .options(*loaders.comment())
+        .filter(models.Comment.id == comment_id)
+        .execution_options(populate_existing=True)
+    )
 
 @router.get("/list/{list_id}", response_model=List[schemas.Card])
-async def get_cards(list_id: str, db: Session = Depends(get_db)):
-    cards = db.query(models.Card).options(
-        joinedload(models.Card.labels).joinedload(models.CardLabel.label),
-        joinedload(models.Card.members).joinedload(models.CardMember.user)
-    ).filter(models.Card.list_id == list_id).order_by(models.Card.position.asc()).all()
-    return cards
+async def get_cards(list_id: str, db: AsyncSession = Depends(get_replica_db)):
+    result = await db.execute(
+        select(models.Card).options(
+            *loaders.card_detail()
+        ).filter(models.Card.list_id == list_id, models.Card.archived_at.is_(None)).order_by(models.Card.position.asc())
+    )
+    return result.scalars().all()
 
 @router.get("/{card_id}", response_model=schemas.Card)
-async def get_card(card_id: str, db: Session = Depends(get_db)):
-    card = db.query(models.Card).options(
-        joinedload(models.Card.list).joinedload(models.List.board),
-        joinedload(models.Card.labels).joinedload(models.CardLabel.label),
-        joinedload(models.Card.members).joinedload(models.CardMember.user),
-        joinedload(models.Card.checklists).joinedload(models.Checklist.items),
-        joinedload(models.Card.attachments),
-        joinedload(models.Card.comments).joinedload(models.Comment.user)
-    ).filter(models.Card.id == card_id).first()
+async def get_card(card_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_replica_db)):
+    # Read the version before the card so the ETag is never newer than the body
+    version = await db.scalar(
+        select(models.Board.version)
+        .join(models.List, models.List.board_id == models.Board.id)
+        .join(models.Card, models.Card.list_id == models.List.id)
+        .where(models.Card.id == card_id)
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Card not found")
+    not_modified = versioning.conditional(request, response, versioning.etag("card", card_id, version))
+    if not_modified:
+        return not_modified
+
+    card = await _load_card(db, card_id)
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     return card
 
 @router.post("/", response_model=schemas.Card, status_code=201)
-async def create_card(card: schemas.CardCreate, db: Session = Depends(get_db)):
-    # If position not provided, get max position and add 1
+async def create_card(card: schemas.CardCreate, db: AsyncSession = Depends(get_db)):
     list_id = card.listId
+    db_list = await db.get(models.List, list_id)
+    if not db_list:
+        raise HTTPException(status_code=404, detail="List not found")
+
+    # If position not provided, append after the last card
     position = card.position
     if position is None:
-        max_position = db.query(func.max(models.Card.position)).filter(
-            models.Card.list_id == list_id
-        ).scalar()
-        position = (max_position + 1) if max_position is not None else 0
-    
-    db_card = models.Card(
-        title=card.title,
-        description=card.description,
-        list_id=list_id,
-        position=position,
-        due_date=card.dueDate,
-        cover_image=card.coverImage
+        position = ranking.append_position(models.Card, models.Card.list_id, list_id)
+
+    db_card = await db.scalar(
+        insert(models.Card)
+        .values(
+            title=card.title,
+            description=card.description,
+            list_id=list_id,
+            position=position,
+            due_date=card.dueDate,
+            cover_image=card.coverImage,
+        )
+        .returning(models.Card)
     )
-    db.add(db_card)
-    db.commit()
-    db.refresh(db_card)
+    loaders.new_card(db_card, db_list)
+    await search_index.index_card(db, db_card)
+    await versioning.touch(db, db_list.board_id)
+    versioning.record(db, "card", db_card.id)
+    events.emit(db, "card.created", cardId=db_card.id, listId=list_id, title=db_card.title, position=db_card.position)
+    await db.commit()
     return db_card
 
+# Declared before /{card_id} so "reorder" isn't captured as a card id
+@router.put("/reorder", response_model=schemas.ReorderResult)
+async def reorder_cards(reorder: schemas.CardReorder, db: AsyncSession = Depends(get_db)):
+    if not reorder.cards:
+        return {"message": "Cards reordered successfully", "ids": []}
+
+    # One UPDATE ... CASE for the whole payload instead of a SELECT per card
+    positions = {item.id: item.position for item in reorder.cards}
+    values = {"position": case_by_id(models.Card.id, positions)}
+    list_ids = {item.id: item.listId for item in reorder.cards if item.listId is not None}
+    if list_ids:
+        values["list_id"] = case_by_id(models.Card.id, list_ids, else_=models.Card.list_id)
+
+    # Boards the cards are leaving and the ones they're moving to
+    await versioning.touch(
+        db,
+        select(models.List.board_id).where(or_(
+            models.List.id.in_(select(models.Card.list_id).where(models.Card.id.in_(positions))),
+            models.List.id.in_(set(list_ids.values())),
+        )),
+    )
+    versioning.record(db, "card", *positions)
+    events.emit(db, "cards.reordered", cards=[item.dict(exclude_none=True) for item in reorder.cards])
+    result = await db.execute(
+        update(models.Card)
+        .where(models.Card.id.in_(positions))
+        .values(**values)
+        .returning(models.Card.id),
+        execution_options={"synchronize_session": False},
+    )
+    ids = result.scalars().all()
+    await db.commit()
+    return {"message": "Cards reordered successfully", "ids": ids}
+
 @router.put("/{card_id}", response_model=schemas.Card)
-async def update_card(card_id: str, card_update: schemas.CardUpdate, db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+async def update_card(card_id: str, card_update: schemas.CardUpdate, db: AsyncSession = Depends(get_db)):
+    db_card = await _load_card(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
     
+    previous_list = db_card.list
     update_data = card_update.dict(exclude_unset=True)
     # Map camelCase to snake_case
     field_mapping = {
-        "listId": "list_id",
         "dueDate": "due_date",
         "coverImage": "cover_image"
     }
     
     for field, value in update_data.items():
+        if field == "listId":
+            # Through the relationship, so the response's list is the new one
+            db_card.list = await db.get(models.List, value)
+            if not db_card.list:
+                raise HTTPException(status_code=404, detail="List not found")
+            continue
         db_field = field_mapping.get(field, field)
         setattr(db_card, db_field, value)
     
-    db.commit()
-    db.refresh(db_card)
+    if "title" in update_data or "description" in update_data:
+        await search_index.index_card(db, db_card)
+    await versioning.touch(db, previous_list.board_id, db_card.list.board_id)
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.updated", cardId=card_id, **update_data)
+    await db.commit()
     return db_card
 
 @router.put("/{card_id}/move", response_model=schemas.Card)
-async def move_card(card_id: str, move: schemas.CardMove, db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+async def move_card(card_id: str, move: schemas.CardMove, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    db_card = await _load_card(db, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
-    
-    db_card.list_id = move.listId
-    db_card.position = move.position
-    db.commit()
-    db.refresh(db_card)
+    destination = db_card.list if db_card.list_id == move.listId else await db.get(models.List, move.listId)
+    if not destination:
+        raise HTTPException(status_code=404, detail="List not found")
+    
+    # move.position is the index in the destination list; only this card's key changes
+    db_card.position = await ranking.position_at(
+        db, models.Card, models.Card.list_id, move.listId, destination.board_id, move.position,
+        exclude_id=card_id, background_tasks=background_tasks,
+    )
+    await versioning.touch(db, db_card.list.board_id, destination.board_id)
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.moved", cardId=card_id, listId=move.listId, position=db_card.position)
+    db_card.list = destination
+    await db.commit()
     return db_card
 
-@router.put("/reorder")
-async def reorder_cards(reorder: dict, db: Session = Depends(get_db)):
-    cards_data = reorder.get("cards", [])
-    for item in cards_data:
-        db_card = db.query(models.Card).filter(models.Card.id == item.get("id")).first()
-        if db_card:
-            if "listId" in item:
-                db_card.list_id = item["listId"]
-            if "position" in item:
-                db_card.position = item["position"]
-    db.commit()
-    return {"message": "Cards reordered successfully"}
-
-@router.post("/{card_id}/labels")
-async def add_label_to_card(card_id: str, label_data: dict, db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+@router.post("/{card_id}/archive", response_model=schemas.Card)
+async def archive_card(card_id: str, db: AsyncSession = Depends(get_db)):
+    db_card = await _load_card(db, card_id)
+    if not db_card:
+        raise HTTPException(status_code=404, detail="Card not found")
+    if db_card.archived_at is not None:
+        return db_card
+
+    # Stamped by the database so it's stored like every other timestamp;
+    # RETURNING hands it back for the response
+    stamped = (await db.execute(
+        update(models.Card)
+        .where(models.Card.id == card_id)
+        .values(archived_at=func.now())
+        .returning(models.Card.archived_at, models.Card.updated_at),
+        execution_options={"synchronize_session": False},
+    )).one()
+    loaders.known(db_card, archived_at=stamped.archived_at, updated_at=stamped.updated_at)
+    await versioning.touch(db, db_card.list.board_id)
+    # Gone from the board as far as clients are concerned
+    versioning.record(db, "card", card_id, op=versioning.DELETE)
+    events.emit(db, "card.archived", cardId=card_id)
+    await db.commit()
+    return db_card
+
+@router.post("/{card_id}/restore", response_model=schemas.Card)
+async def restore_card(card_id: str, restore: schemas.CardRestore = schemas.CardRestore(), db: AsyncSession = Depends(get_db)):
+    db_card = await _load_card(db, card_id)
+    if db_card is not None and db_card.archived_at is None:
+        raise HTTPException(status_code=400, detail="Card is not archived")
+    archived = None if db_card else await db.get(models.CardArchive, card_id)
+    if db_card is None and archived is None:
+        raise HTTPException(status_code=404, detail="Card not found")
+
+    list_id = restore.listId or (db_card or archived).list_id
+    db_list = await db.get(models.List, list_id)
+    if not db_list:
+        if restore.listId:
+            raise HTTPException(status_code=404, detail="List not found")
+        raise HTTPException(status_code=409, detail="The card's list was deleted; restore it with a listId")
+
+    if db_card:
+        # Still in the live tables: only hidden
+        values = {"archived_at": None}
+        if db_card.list_id != list_id:
+            values.update(list_id=list_id, position=ranking.append_position(models.Card, models.Card.list_id, list_id))
+        restored = (await db.execute(
+            update(models.Card)
+            .where(models.Card.id == card_id)
+            .values(**values)
+            .returning(models.Card.list_id, models.Card.position, models.Card.archived_at, models.Card.updated_at),
+            execution_options={"synchronize_session": False},
+        )).one()
+        loaders.known(db_card, list=db_list, **restored._mapping)
+    else:
+        await archive.restore(db, archived, db_list)
+        # Its rows were only just written; read them back before the commit
+        db_card = await _load_card(db, card_id)
+    await versioning.touch(db, db_list.board_id)
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.restored", cardId=card_id, listId=list_id)
+    await db.commit()
+    return db_card
+
+@router.post("/{card_id}/labels", response_model=schemas.CardLabel)
+async def add_label_to_card(card_id: str, label_data: dict, db: AsyncSession = Depends(get_db)):
+    db_card = await db.get(models.Card, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
     
     # Check if label already exists
-    existing = db.query(models.CardLabel).filter(
+    existing = await db.scalar(select(models.CardLabel).filter(
         models.CardLabel.card_id == card_id,
         models.CardLabel.label_id == label_data["labelId"]
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(status_code=400, detail="Label already attached to card")
     
-    card_label = models.CardLabel(card_id=card_id, label_id=label_data["labelId"])
+    db_label = await db.get(models.Label, label_data["labelId"])
+    if not db_label:
+        raise HTTPException(status_code=404, detail="Label not found")
+
+    card_label = models.CardLabel(card_id=card_id, label=db_label)
     db.add(card_label)
-    db.commit()
-    db.refresh(card_label)
+    await versioning.touch(db, versioning.board_of_card(card_id))
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.label_added", cardId=card_id, labelId=label_data["labelId"])
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request attached it first
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Label already attached to card")
     return card_label
 
 @router.delete("/{card_id}/labels/{label_id}")
-async def remove_label_from_card(card_id: str, label_id: str, db: Session = Depends(get_db)):
-    card_label = db.query(models.CardLabel).filter(
+async def remove_label_from_card(card_id: str, label_id: str, db: AsyncSession = Depends(get_db)):
+    card_label = await db.scalar(select(models.CardLabel).filter(
         models.CardLabel.card_id == card_id,
         models.CardLabel.label_id == label_id
-    ).first()
+    ))
     
     if not card_label:
         raise HTTPException(status_code=404, detail="Label not found on card")
     
-    db.delete(card_label)
-    db.commit()
+    await versioning.touch(db, versioning.board_of_card(card_id))
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.label_removed", cardId=card_id, labelId=label_id)
+    await db.delete(card_label)
+    await db.commit()
     return {"message": "Label removed successfully"}
 
-@router.post("/{card_id}/members")
-async def add_member_to_card(card_id: str, member_data: dict, db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+@router.post("/{card_id}/members", response_model=schemas.CardMember)
+async def add_member_to_card(card_id: str, member_data: dict, db: AsyncSession = Depends(get_db)):
+    db_card = await db.get(models.Card, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
     
     # Check if member already exists
-    existing = db.query(models.CardMember).filter(
+    existing = await db.scalar(select(models.CardMember).filter(
         models.CardMember.card_id == card_id,
         models.CardMember.user_id == member_data["userId"]
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(status_code=400, detail="Member already assigned to card")
     
-    card_member = models.CardMember(card_id=card_id, user_id=member_data["userId"])
+    db_user = await db.get(models.User, member_data["userId"])
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    card_member = models.CardMember(card_id=card_id, user=db_user)
     db.add(card_member)
-    db.commit()
-    db.refresh(card_member)
+    await versioning.touch(db, versioning.board_of_card(card_id))
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.member_added", cardId=card_id, userId=member_data["userId"])
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request assigned them first
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Member already assigned to card")
     return card_member
 
 @router.delete("/{card_id}/members/{user_id}")
-async def remove_member_from_card(card_id: str, user_id: str, db: Session = Depends(get_db)):
-    card_member = db.query(models.CardMember).filter(
+async def remove_member_from_card(card_id: str, user_id: str, db: AsyncSession = Depends(get_db)):
+    card_member = await db.scalar(select(models.CardMember).filter(
         models.CardMember.card_id == card_id,
         models.CardMember.user_id == user_id
-    ).first()
+    ))
     
     if not card_member:
         raise HTTPException(status_code=404, detail="Member not found on card")
     
-    db.delete(card_member)
-    db.commit()
+    await versioning.touch(db, versioning.board_of_card(card_id))
+    versioning.record(db, "card", card_id)
+    events.emit(db, "card.member_removed", cardId=card_id, userId=user_id)
+    await db.delete(card_member)
+    await db.commit()
     return {"message": "Member removed successfully"}
 
 @router.post("/{card_id}/checklists", response_model=schemas.Checklist, status_code=201)
-async def create_checklist(card_id: str, checklist: schemas.ChecklistCreate, db: Session = Depends(get_db)):
-    # If position not provided, get max position and add 1
-    if checklist.position is None:
-        max_position = db.query(func.max(models.Checklist.position)).filter(
-            models.Checklist.card_id == card_id
-        ).scalar()
-        checklist.position = (max_position + 1) if max_position is not None else 0
-    
+async def create_checklist(card_id: str, checklist: schemas.ChecklistCreate, db: AsyncSession = Depends(get_db)):
+    # If position not provided, go after the last checklist
     checklist_data = checklist.dict()
+    if checklist_data["position"] is None:
+        checklist_data["position"] = ranking.append_position(models.Checklist, models.Checklist.card_id, card_id, step=1)
     checklist_data["card_id"] = card_id
-    db_checklist = models.Checklist(**checklist_data)
-    db.add(db_checklist)
-    db.commit()
-    db.refresh(db_checklist)
+    db_checklist = await db.scalar(insert(models.Checklist).values(**checklist_data).returning(models.Checklist))
+    loaders.known(db_checklist, items=[])
+    await versioning.touch(db, versioning.board_of_card(card_id))
+    versioning.record(db, "card", card_id)
+    events.emit(db, "checklist.created", cardId=card_id, checklistId=db_checklist.id)
+    await db.commit()
     return db_checklist
 
 @router.put("/checklists/{checklist_id}", response_model=schemas.Checklist)
-async def update_checklist(checklist_id: str, checklist_update: schemas.ChecklistUpdate, db: Session = Depends(get_db)):
-    db_checklist = db.query(models.Checklist).filter(models.Checklist.id == checklist_id).first()
+async def update_checklist(checklist_id: str, checklist_update: schemas.ChecklistUpdate, db: AsyncSession = Depends(get_db)):
+    db_checklist = await _load_checklist(db, checklist_id)
     if not db_checklist:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
@@ -203,155 +385,239 @@ async def update_checklist(checklist_id: str, checklist_update: schemas.Checklis
     for field, value in update_data.items():
         setattr(db_checklist, field, value)
     
-    db.commit()
-    db.refresh(db_checklist)
+    await versioning.touch(db, versioning.board_of_checklist(checklist_id))
+    versioning.record(db, "card", db_checklist.card_id)
+    events.emit(db, "checklist.updated", cardId=db_checklist.card_id, checklistId=checklist_id, **update_data)
+    await db.commit()
     return db_checklist
 
 @router.delete("/checklists/{checklist_id}")
-async def delete_checklist(checklist_id: str, db: Session = Depends(get_db)):
-    db_checklist = db.query(models.Checklist).filter(models.Checklist.id == checklist_id).first()
+async def delete_checklist(checklist_id: str, db: AsyncSession = Depends(get_db)):
+    db_checklist = await db.get(models.Checklist, checklist_id)
     if not db_checklist:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    db.delete(db_checklist)
-    db.commit()
+    total, done = await badges.checklist_counts(db, checklist_id)
+    await badges.adjust(db, db_checklist.card_id, checklist_total=-total, checklist_done=-done)
+    await search_index.remove_checklist_items(db, checklist_id)
+    await versioning.touch(db, versioning.board_of_checklist(checklist_id))
+    versioning.record(db, "card", db_checklist.card_id)
+    events.emit(db, "checklist.deleted", cardId=db_checklist.card_id, checklistId=checklist_id)
+    await db.delete(db_checklist)
+    await db.commit()
     return {"message": "Checklist deleted successfully"}
 
 @router.post("/checklists/{checklist_id}/items", response_model=schemas.ChecklistItem, status_code=201)
-async def create_checklist_item(checklist_id: str, item: schemas.ChecklistItemCreate, db: Session = Depends(get_db)):
-    # If position not provided, get max position and add 1
-    if item.position is None:
-        max_position = db.query(func.max(models.ChecklistItem.position)).filter(
-            models.ChecklistItem.checklist_id == checklist_id
-        ).scalar()
-        item.position = (max_position + 1) if max_position is not None else 0
-    
+async def create_checklist_item(checklist_id: str, item: schemas.ChecklistItemCreate, db: AsyncSession = Depends(get_db)):
+    db_checklist = await db.get(models.Checklist, checklist_id)
+    if not db_checklist:
+        raise HTTPException(status_code=404, detail="Checklist not found")
+
+    # If position not provided, go after the last item
     item_data = item.dict()
+    if item_data["position"] is None:
+        item_data["position"] = ranking.append_position(models.ChecklistItem, models.ChecklistItem.checklist_id, checklist_id, step=1)
     item_data["checklist_id"] = checklist_id
-    db_item = models.ChecklistItem(**item_data)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    db_item = await db.scalar(insert(models.ChecklistItem).values(**item_data).returning(models.ChecklistItem))
+    await search_index.index_checklist_item(db, db_item, db_checklist.card_id)
+    await badges.adjust(db, db_checklist.card_id, checklist_total=1, checklist_done=int(bool(db_item.is_completed)))
+    await versioning.touch(db, versioning.board_of_checklist(checklist_id))
+    versioning.record(db, "card", db_checklist.card_id)
+    events.emit(db, "checklist_item.created", cardId=db_checklist.card_id, checklistId=checklist_id, itemId=db_item.id)
+    await db.commit()
     return db_item
 
 @router.put("/checklist-items/{item_id}", response_model=schemas.ChecklistItem)
-async def update_checklist_item(item_id: str, item_update: schemas.ChecklistItemUpdate, db: Session = Depends(get_db)):
-    db_item = db.query(models.ChecklistItem).filter(models.ChecklistItem.id == item_id).first()
+async def update_checklist_item(item_id: str, item_update: schemas.ChecklistItemUpdate, db: AsyncSession = Depends(get_db)):
+    db_item = await db.get(models.ChecklistItem, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Checklist item not found")
     
+    was_completed = db_item.is_completed
     update_data = item_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_item, field, value)
     
-    db.commit()
-    db.refresh(db_item)
+    db_checklist = await db.get(models.Checklist, db_item.checklist_id)
+    if "text" in update_data:
+        await search_index.index_checklist_item(db, db_item, db_checklist.card_id)
+    await badges.adjust(db, db_checklist.card_id, checklist_done=int(bool(db_item.is_completed)) - int(bool(was_completed)))
+    await versioning.touch(db, versioning.board_of_checklist(db_item.checklist_id))
+    versioning.record(db, "card", db_checklist.card_id)
+    events.emit(db, "checklist_item.updated", checklistId=db_item.checklist_id, itemId=item_id, **update_data)
+    await db.commit()
     return db_item
 
 @router.delete("/checklist-items/{item_id}")
-async def delete_checklist_item(item_id: str, db: Session = Depends(get_db)):
-    db_item = db.query(models.ChecklistItem).filter(models.ChecklistItem.id == item_id).first()
+async def delete_checklist_item(item_id: str, db: AsyncSession = Depends(get_db)):
+    db_item = await db.get(models.ChecklistItem, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Checklist item not found")
     
-    db.delete(db_item)
-    db.commit()
+    db_checklist = await db.get(models.Checklist, db_item.checklist_id)
+    await search_index.remove(db, CHECKLIST_ITEM, item_id)
+    await badges.adjust(db, db_checklist.card_id, checklist_total=-1, checklist_done=-int(bool(db_item.is_completed)))
+    await versioning.touch(db, versioning.board_of_checklist(db_item.checklist_id))
+    versioning.record(db, "card", db_checklist.card_id)
+    events.emit(db, "checklist_item.deleted", checklistId=db_item.checklist_id, itemId=item_id)
+    await db.delete(db_item)
+    await db.commit()
     return {"message": "Checklist item deleted successfully"}
 
-@router.post("/{card_id}/attachments", response_model=schemas.Attachment, status_code=201)
-async def upload_attachment(card_id: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+@router.post(
+    "/{card_id}/attachments",
+    response_model=schemas.Attachment,
+    status_code=201,
+    openapi_extra=uploads.openapi_body("file"),
+)
+async def upload_attachment(card_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # Checked before the body is read, so a bad card doesn't cost the upload
+    db_card = await db.get(models.Card, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
-    
-    # Validate file type
-    allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'application/pdf', 
-                     'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain']
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Invalid file type")
-    
-    # Save file
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{datetime.now().timestamp()}-{os.urandom(8).hex()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Get file size
-    file_size = os.path.getsize(file_path)
-    
-    # Create attachment record
-    # In production, use full URL. For now, use relative path
-    file_url = f"/uploads/{unique_filename}"
-    attachment = models.Attachment(
-        name=file.filename,
-        url=file_url,
-        type=file.content_type or "application/octet-stream",
-        size=file_size,
-        card_id=card_id
-    )
-    db.add(attachment)
-    db.commit()
-    db.refresh(attachment)
+    # Hand the connection back while the body streams; on SQLite it's the writer
+    await db.rollback()
+    
+    received = await uploads.receive_file(request, storage.blob_store.staging_dir, "file", allowed_types=ALLOWED_TYPES)
+    key = storage.blob_key(received.sha256, received.content_type)
+    try:
+        # Stored before the write transaction opens, so a slow upload (to S3,
+        # say) never holds the writer; identical content is already stored
+        # and this copy is just dropped
+        await storage.blob_store.put(key, received.temp_path, received.content_type)
+    finally:
+        await received.discard()
+    try:
+        # The blob row first: once it's claimed the collector leaves the file alone
+        await storage.claim(db, key, received.size, received.content_type)
+        # Identical content may already have its thumbnails
+        thumbnail_url, preview_url = await thumbnails.existing(db, key) or (None, None)
+        attachment = models.Attachment(
+            name=received.filename,
+            url=storage.blob_store.url(key),
+            type=received.content_type,
+            size=received.size,
+            blob_key=key,
+            thumbnail_url=thumbnail_url,
+            preview_url=preview_url,
+            card_id=card_id
+        )
+        db.add(attachment)
+        await badges.adjust(db, card_id, attachment_count=1)
+        await versioning.touch(db, versioning.board_of_card(card_id))
+        await db.flush()
+        versioning.record(db, "card", card_id)
+        events.emit(db, "attachment.created", cardId=card_id, attachmentId=attachment.id)
+        # The collector may have removed an unreferenced copy between the put
+        # and the claim; the claim keeps it from happening again from here on
+        if not await storage.blob_store.exists(key):
+            raise HTTPException(status_code=503, detail="The upload was cleaned up while being saved; try again")
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        # Nothing may reference the file just stored; let the collector decide
+        await storage.abandon(key, received.size, received.content_type)
+        raise
+    if thumbnail_url is None:
+        thumbnails.schedule(key, received.content_type)
     return attachment
 
 @router.delete("/attachments/{attachment_id}")
-async def delete_attachment(attachment_id: str, db: Session = Depends(get_db)):
-    db_attachment = db.query(models.Attachment).filter(models.Attachment.id == attachment_id).first()
+async def delete_attachment(attachment_id: str, db: AsyncSession = Depends(get_db)):
+    db_attachment = await db.get(models.Attachment, attachment_id)
     if not db_attachment:
         raise HTTPException(status_code=404, detail="Attachment not found")
     
-    # Delete file
-    file_path = os.path.join(UPLOAD_DIR, os.path.basename(db_attachment.url))
-    if os.path.exists(file_path):
-        os.remove(file_path)
-    
-    db.delete(db_attachment)
-    db.commit()
+    await badges.adjust(db, db_attachment.card_id, attachment_count=-1)
+    await versioning.touch(db, versioning.board_of_card(db_attachment.card_id))
+    versioning.record(db, "card", db_attachment.card_id)
+    events.emit(db, "attachment.deleted", cardId=db_attachment.card_id, attachmentId=attachment_id)
+    # The file goes once no other attachment shares it
+    await storage.release(db, [db_attachment.blob_key])
+    await db.delete(db_attachment)
+    await db.commit()
+    if db_attachment.blob_key is None:
+        # Uploaded before blobs; only once the row is gone, so a failed delete doesn't leave a dangling url
+        await run_in_threadpool(_remove_upload, os.path.join(storage.UPLOAD_DIR, os.path.basename(db_attachment.url)))
     return {"message": "Attachment deleted successfully"}
 
+@router.get("/{card_id}/comments", response_model=List[schemas.Comment])
+async def get_comments(card_id: str, response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_read_db)):
+    if not await db.get(models.Card, card_id):
+        raise HTTPException(status_code=404, detail="Card not found")
+
+    # Newest first, like Card.comments
+    result = await db.execute(paginate(
+        select(models.Comment)
+        .options(*loaders.comment())
+        .filter(models.Comment.card_id == card_id),
+        page, desc(models.Comment.created_at), desc(models.Comment.id),
+    ))
+    return finish(result.scalars(), page, response, lambda comment: (comment.created_at, comment.id))
+
 @router.post("/{card_id}/comments", response_model=schemas.Comment, status_code=201)
-async def create_comment(card_id: str, comment: schemas.CommentCreate, db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+async def create_comment(card_id: str, comment: schemas.CommentCreate, db: AsyncSession = Depends(get_db)):
+    db_card = await db.get(models.Card, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
     
     comment_data = comment.dict()
+    db_user = await db.get(models.User, comment_data["user_id"])
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     comment_data["card_id"] = card_id
-    db_comment = models.Comment(**comment_data)
+    db_comment = models.Comment(**comment_data, user=db_user)
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.flush()
+    await search_index.index_comment(db, db_comment)
+    await badges.adjust(db, card_id, comment_count=1)
+    await versioning.touch(db, versioning.board_of_card(db_comment.card_id))
+    versioning.record(db, "card", card_id)
+    events.emit(db, "comment.created", cardId=card_id, commentId=db_comment.id)
+    await db.commit()
     return db_comment
 
 @router.put("/comments/{comment_id}", response_model=schemas.Comment)
-async def update_comment(comment_id: str, comment_update: schemas.CommentUpdate, db: Session = Depends(get_db)):
-    db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+async def update_comment(comment_id: str, comment_update: schemas.CommentUpdate, db: AsyncSession = Depends(get_db)):
+    db_comment = await _load_comment(db, comment_id)
     if not db_comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
     db_comment.text = comment_update.text
-    db.commit()
-    db.refresh(db_comment)
+    await search_index.index_comment(db, db_comment)
+    await versioning.touch(db, versioning.board_of_card(db_comment.card_id))
+    versioning.record(db, "card", db_comment.card_id)
+    events.emit(db, "comment.updated", cardId=db_comment.card_id, commentId=comment_id)
+    await db.commit()
     return db_comment
 
 @router.delete("/comments/{comment_id}")
-async def delete_comment(comment_id: str, db: Session = Depends(get_db)):
-    db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+async def delete_comment(comment_id: str, db: AsyncSession = Depends(get_db)):
+    db_comment = await db.get(models.Comment, comment_id)
     if not db_comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
-    db.delete(db_comment)
-    db.commit()
+    await search_index.remove(db, COMMENT, comment_id)
+    await badges.adjust(db, db_comment.card_id, comment_count=-1)
+    await versioning.touch(db, versioning.board_of_card(db_comment.card_id))
+    versioning.record(db, "card", db_comment.card_id)
+    events.emit(db, "comment.deleted", cardId=db_comment.card_id, commentId=comment_id)
+    await db.delete(db_comment)
+    await db.commit()
     return {"message": "Comment deleted successfully"}
 
 @router.delete("/{card_id}")
-async def delete_card(card_id: str, db: Session = Depends(get_db)):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
+async def delete_card(card_id: str, db: AsyncSession = Depends(get_db)):
+    db_card = await db.get(models.Card, card_id)
     if not db_card:
         raise HTTPException(status_code=404, detail="Card not found")
     
-    db.delete(db_card)
-    db.commit()
+    await search_index.remove_cards(db, [card_id])
+    await versioning.touch(db, versioning.board_of_card(card_id))
+    versioning.record(db, "card", card_id, op=versioning.DELETE)
+    events.emit(db, "card.deleted", cardId=card_id)
+    await storage.release(db, select(models.Attachment.blob_key).where(models.Attachment.card_id == card_id))
+    await db.delete(db_card)
+    await db.commit()
     return {"message": "Card deleted successfully"}
@@ -1,31 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, get_replica_db
+from app import events, models, schemas, versioning
 
 router = APIRouter()
 
 @router.get("/board/{board_id}", response_model=List[schemas.Label])
-async def get_labels(board_id: str, db: Session = Depends(get_db)):
-    labels = db.query(models.Label).filter(models.Label.board_id == board_id).order_by(models.Label.created_at.asc()).all()
-    return labels
+async def get_labels(board_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_replica_db)):
+    version = await db.scalar(select(models.Board.version).where(models.Board.id == board_id))
+    if version is not None:
+        not_modified = versioning.conditional(request, response, versioning.etag("labels", board_id, version))
+        if not_modified:
+            return not_modified
+
+    labels = await db.scalars(
+        select(models.Label).filter(models.Label.board_id == board_id).order_by(models.Label.created_at.asc())
+    )
+    return labels.all()
 
 @router.post("/", response_model=schemas.Label, status_code=201)
-async def create_label(label: schemas.LabelCreate, db: Session = Depends(get_db)):
+async def create_label(label: schemas.LabelCreate, db: AsyncSession = Depends(get_db)):
     db_label = models.Label(
         name=label.name,
         color=label.color,
         board_id=label.boardId
     )
     db.add(db_label)
-    db.commit()
-    db.refresh(db_label)
+    await versioning.touch(db, label.boardId)
+    await db.flush()
+    versioning.record(db, "label", db_label.id)
+    events.emit(db, "label.created", labelId=db_label.id)
+    await db.commit()
     return db_label
 
 @router.put("/{label_id}", response_model=schemas.Label)
-async def update_label(label_id: str, label_update: schemas.LabelUpdate, db: Session = Depends(get_db)):
-    db_label = db.query(models.Label).filter(models.Label.id == label_id).first()
+async def update_label(label_id: str, label_update: schemas.LabelUpdate, db: AsyncSession = Depends(get_db)):
+    db_label = await db.get(models.Label, label_id)
     if not db_label:
         raise HTTPException(status_code=404, detail="Label not found")
     
@@ -33,16 +45,21 @@ async def update_label(label_id: str, label_update: schemas.LabelUpdate, db: Ses
     for field, value in update_data.items():
         setattr(db_label, field, value)
     
-    db.commit()
-    db.refresh(db_label)
+    await versioning.touch(db, db_label.board_id)
+    versioning.record(db, "label", label_id)
+    events.emit(db, "label.updated", labelId=label_id, **update_data)
+    await db.commit()
     return db_label
 
 @router.delete("/{label_id}")
-async def delete_label(label_id: str, db: Session = Depends(get_db)):
-    db_label = db.query(models.Label).filter(models.Label.id == label_id).first()
+async def delete_label(label_id: str, db: AsyncSession = Depends(get_db)):
+    db_label = await db.get(models.Label, label_id)
     if not db_label:
         raise HTTPException(status_code=404, detail="Label not found")
     
-    db.delete(db_label)
-    db.commit()
+    await versioning.touch(db, db_label.board_id)
+    versioning.record(db, "label", label_id, op=versioning.DELETE)
+    events.emit(db, "label.deleted", labelId=label_id)
+    await db.delete(db_label)
+    await db.commit()
     return {"message": "Label deleted successfully"}
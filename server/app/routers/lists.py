@@ -1,79 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, get_read_db
+from app.ids import case_by_id
+from app import events, loaders, models, ranking, schemas, storage, versioning
+from app.search_index import search_index
 
 router = APIRouter()
 
+async def _load_list(db: AsyncSession, list_id: str):
+    result = await db.execute(
+        select(models.List)
+        .options(*loaders.list_tree())
+        .filter(models.List.id == list_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 @router.get("/board/{board_id}", response_model=List[schemas.List])
-async def get_lists(board_id: str, db: Session = Depends(get_db)):
-    lists = db.query(models.List).options(
-        joinedload(models.List.cards)
-    ).filter(models.List.board_id == board_id).order_by(models.List.position.asc()).all()
-    return lists
+async def get_lists(board_id: str, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(
+        select(models.List).options(
+            *loaders.list_tree()
+        ).filter(models.List.board_id == board_id).order_by(models.List.position.asc())
+    )
+    return result.scalars().all()
 
 @router.get("/{list_id}", response_model=schemas.List)
-async def get_list(list_id: str, db: Session = Depends(get_db)):
-    list_item = db.query(models.List).options(
-        joinedload(models.List.cards)
-    ).filter(models.List.id == list_id).first()
+async def get_list(list_id: str, db: AsyncSession = Depends(get_read_db)):
+    list_item = await _load_list(db, list_id)
     if not list_item:
         raise HTTPException(status_code=404, detail="List not found")
     return list_item
 
 @router.post("/", response_model=schemas.List, status_code=201)
-async def create_list(list: schemas.ListCreate, db: Session = Depends(get_db)):
-    # If position not provided, get max position and add 1
+async def create_list(list: schemas.ListCreate, db: AsyncSession = Depends(get_db)):
+    # If position not provided, append after the last list
     board_id = list.boardId
     position = list.position
     if position is None:
-        max_position = db.query(func.max(models.List.position)).filter(
-            models.List.board_id == board_id
-        ).scalar()
-        position = (max_position + 1) if max_position is not None else 0
-    
-    db_list = models.List(
-        title=list.title,
-        board_id=board_id,
-        position=position
+        position = ranking.append_position(models.List, models.List.board_id, board_id)
+
+    db_list = await db.scalar(
+        insert(models.List)
+        .values(title=list.title, board_id=board_id, position=position)
+        .returning(models.List)
     )
-    db.add(db_list)
-    db.commit()
-    db.refresh(db_list)
+    loaders.known(db_list, cards=[])
+    await versioning.touch(db, board_id)
+    versioning.record(db, "list", db_list.id)
+    events.emit(db, "list.created", listId=db_list.id, title=db_list.title, position=db_list.position)
+    await db.commit()
     return db_list
 
+# Declared before /{list_id} so "reorder" isn't captured as a list id
+@router.put("/reorder", response_model=schemas.ReorderResult)
+async def reorder_lists(reorder: schemas.ListReorder, db: AsyncSession = Depends(get_db)):
+    if not reorder.lists:
+        return {"message": "Lists reordered successfully", "ids": []}
+
+    # One UPDATE ... CASE for the whole payload instead of a SELECT per list
+    positions = {item.id: item.position for item in reorder.lists}
+    await versioning.touch(db, select(models.List.board_id).where(models.List.id.in_(positions)))
+    versioning.record(db, "list", *positions)
+    events.emit(db, "lists.reordered", lists=[{"id": item.id, "position": item.position} for item in reorder.lists])
+    result = await db.execute(
+        update(models.List)
+        .where(models.List.id.in_(positions))
+        .values(position=case_by_id(models.List.id, positions))
+        .returning(models.List.id),
+        execution_options={"synchronize_session": False},
+    )
+    ids = result.scalars().all()
+    await db.commit()
+    return {"message": "Lists reordered successfully", "ids": ids}
+
 @router.put("/{list_id}", response_model=schemas.List)
-async def update_list(list_id: str, list_update: schemas.ListUpdate, db: Session = Depends(get_db)):
-    db_list = db.query(models.List).filter(models.List.id == list_id).first()
+async def update_list(list_id: str, list_update: schemas.ListUpdate, db: AsyncSession = Depends(get_db)):
+    db_list = await _load_list(db, list_id)
     if not db_list:
         raise HTTPException(status_code=404, detail="List not found")
-    
+
     update_data = list_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_list, field, value)
-    
-    db.commit()
-    db.refresh(db_list)
+
+    await versioning.touch(db, db_list.board_id)
+    versioning.record(db, "list", list_id)
+    events.emit(db, "list.updated", listId=list_id, **update_data)
+    await db.commit()
     return db_list
 
-@router.put("/reorder")
-async def reorder_lists(reorder: dict, db: Session = Depends(get_db)):
-    lists_data = reorder.get("lists", [])
-    for item in lists_data:
-        db_list = db.query(models.List).filter(models.List.id == item.get("id")).first()
-        if db_list:
-            db_list.position = item.get("position", db_list.position)
-    db.commit()
-    return {"message": "Lists reordered successfully"}
+@router.put("/{list_id}/move", response_model=schemas.List)
+async def move_list(list_id: str, move: schemas.ListMove, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    db_list = await _load_list(db, list_id)
+    if not db_list:
+        raise HTTPException(status_code=404, detail="List not found")
+
+    # move.position is the index on the board; only this list's key changes
+    db_list.position = await ranking.position_at(
+        db, models.List, models.List.board_id, db_list.board_id, db_list.board_id, move.position,
+        exclude_id=list_id, background_tasks=background_tasks,
+    )
+    await versioning.touch(db, db_list.board_id)
+    versioning.record(db, "list", list_id)
+    events.emit(db, "list.moved", listId=list_id, position=db_list.position)
+    await db.commit()
+    return db_list
 
 @router.delete("/{list_id}")
-async def delete_list(list_id: str, db: Session = Depends(get_db)):
-    db_list = db.query(models.List).filter(models.List.id == list_id).first()
+async def delete_list(list_id: str, db: AsyncSession = Depends(get_db)):
+    db_list = await db.get(models.List, list_id)
     if not db_list:
         raise HTTPException(status_code=404, detail="List not found")
-    
-    db.delete(db_list)
-    db.commit()
+
+    await search_index.remove_cards(db, select(models.Card.id).filter(models.Card.list_id == list_id))
+    await versioning.touch(db, db_list.board_id)
+    versioning.record(db, "list", list_id, op=versioning.DELETE)
+    events.emit(db, "list.deleted", listId=list_id)
+    await storage.release(
+        db,
+        select(models.Attachment.blob_key).join(models.Card).filter(models.Card.list_id == list_id),
+    )
+    await db.delete(db_list)
+    await db.commit()
     return {"message": "List deleted successfully"}
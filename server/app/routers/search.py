@@ -1,29 +1,40 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.database import get_db
-from app import models, schemas
+from app.database import get_replica_db
+from app import loaders, models, schemas
+from app.pagination import PageParams, asc, desc, finish, paginate
+from app.search_index import search_index
 
 router = APIRouter()
 
 @router.get("/cards", response_model=List[schemas.Card])
 async def search_cards(
+    response: Response,
     q: Optional[str] = Query(None, description="Search query"),
     label_id: Optional[str] = Query(None, description="Filter by label"),
     user_id: Optional[str] = Query(None, description="Filter by user"),
     due_date: Optional[str] = Query(None, description="Filter by due date (YYYY-MM-DD)"),
     board_id: Optional[str] = Query(None, description="Filter by board"),
-    db: Session = Depends(get_db)
+    archived: bool = Query(False, description="Also match archived cards not yet moved to the archive"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_replica_db)
 ):
-    query = db.query(models.Card)
+    query = select(models.Card).options(*loaders.card_detail())
+    if not archived:
+        query = query.filter(models.Card.archived_at.is_(None))
     
     if board_id:
         query = query.join(models.List).filter(models.List.board_id == board_id)
     
+    matches = None
     if q:
-        query = query.filter(models.Card.title.ilike(f"%{q}%"))
+        matches = search_index.matches(q)
+        if matches is None:
+            return []
+        query = query.join(matches, matches.c.card_id == models.Card.id)
     
     if label_id:
         query = query.join(models.CardLabel).filter(models.CardLabel.label_id == label_id)
@@ -44,5 +55,14 @@ async def search_cards(
         except ValueError:
             pass
     
-    cards = query.order_by(models.Card.created_at.desc()).all()
-    return cards
+    if matches is not None:
+        # Best matches first; the score is part of the cursor
+        result = await db.execute(paginate(
+            query.add_columns(matches.c.score),
+            page, asc(matches.c.score), desc(models.Card.created_at), desc(models.Card.id),
+        ))
+        rows = finish(result.all(), page, response, lambda row: (row[1], row[0].created_at, row[0].id))
+        return [card for card, _ in rows]
+
+    result = await db.execute(paginate(query, page, desc(models.Card.created_at), desc(models.Card.id)))
+    return finish(result.scalars(), page, response, lambda card: (card.created_at, card.id))
@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_read_db, get_replica_db
 from app import models, schemas
+from app.pagination import PageParams, asc, finish, paginate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.User])
-async def get_users(db: Session = Depends(get_db)):
-    users = db.query(models.User).order_by(models.User.name.asc()).all()
-    return users
+async def get_users(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_replica_db)):
+    # Pickers list people alphabetically, so users page on (name, id)
+    users = await db.scalars(paginate(select(models.User), page, asc(models.User.name), asc(models.User.id)))
+    return finish(users, page, response, lambda user: (user.name, user.id))
 
 @router.get("/{user_id}", response_model=schemas.User)
-async def get_user(user_id: str, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(user_id: str, db: AsyncSession = Depends(get_read_db)):
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
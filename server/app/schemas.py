@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 from datetime import datetime
 from pydantic import field_serializer
 
@@ -43,39 +43,80 @@ class Board(BoardBase):
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
+class BoardSummary(BoardBase):
+    id: str
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+    updated_at: Optional[datetime] = Field(None, alias="updatedAt")
+    list_count: int = Field(0, alias="listCount")
+    card_count: int = Field(0, alias="cardCount")
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+class BoardRef(BoardBase):
+    id: str
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+    updated_at: Optional[datetime] = Field(None, alias="updatedAt")
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+class DeletedIds(BaseModel):
+    lists: list[str] = Field(default_factory=list)
+    cards: list[str] = Field(default_factory=list)
+    labels: list[str] = Field(default_factory=list)
+
+# What changed on a board after version `since`. With resync set the log
+# doesn't reach back that far and the client must refetch the whole board.
+class BoardDelta(BaseModel):
+    version: int
+    since: int
+    resync: bool = False
+    board: Optional[BoardRef] = None
+    lists: list[ListRef] = Field(default_factory=list)
+    cards: list[CardInList] = Field(default_factory=list)
+    labels: list[Label] = Field(default_factory=list)
+    deleted: DeletedIds = Field(default_factory=DeletedIds)
+
 # List schemas
 class ListBase(BaseModel):
     title: str
     board_id: str = Field(alias="boardId")
-    position: Optional[int] = None
+    position: Optional[float] = None
     
     model_config = ConfigDict(populate_by_name=True)
 
 class ListCreate(BaseModel):
     title: str
     boardId: str
-    position: Optional[int] = None
+    position: Optional[float] = None
 
 class ListUpdate(BaseModel):
     title: Optional[str] = None
-    position: Optional[int] = None
+    position: Optional[float] = None
+
+class ListMove(BaseModel):
+    # Index on the board, not a rank key
+    position: int
+
+class ListPosition(BaseModel):
+    id: str
+    position: float
 
 class ListReorder(BaseModel):
-    lists: list[Dict[str, Any]] = Field(default_factory=list)
+    lists: list[ListPosition] = Field(default_factory=list)
 
 class List(ListBase):
     id: str
-    position: int
+    position: float
     created_at: datetime = Field(alias="createdAt")
     updated_at: Optional[datetime] = Field(None, alias="updatedAt")
-    cards: list[Card] = Field(default_factory=list)
+    cards: list[CardInList] = Field(default_factory=list)
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 class ListRef(BaseModel):
     id: str
     title: str
-    position: int
+    position: float
     board_id: str = Field(alias="boardId")
     created_at: datetime = Field(alias="createdAt")
     updated_at: Optional[datetime] = Field(None, alias="updatedAt")
@@ -87,7 +128,7 @@ class CardBase(BaseModel):
     title: str
     description: Optional[str] = None
     list_id: str = Field(alias="listId")
-    position: Optional[int] = None
+    position: Optional[float] = None
     due_date: Optional[datetime] = Field(None, alias="dueDate")
     cover_image: Optional[str] = Field(None, alias="coverImage")
     
@@ -97,7 +138,7 @@ class CardCreate(BaseModel):
     title: str
     description: Optional[str] = None
     listId: str
-    position: Optional[int] = None
+    position: Optional[float] = None
     dueDate: Optional[datetime] = None
     coverImage: Optional[str] = None
 
@@ -105,36 +146,76 @@ class CardUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     listId: Optional[str] = None
-    position: Optional[int] = None
+    position: Optional[float] = None
     dueDate: Optional[datetime] = None
     coverImage: Optional[str] = None
 
 class CardMove(BaseModel):
     listId: str
+    # Index in the destination list, not a rank key
     position: int
 
+class CardRestore(BaseModel):
+    # Required only when the card's own list has been deleted
+    listId: Optional[str] = None
+
+class CardPosition(BaseModel):
+    id: str
+    listId: Optional[str] = None
+    position: float
+
 class CardReorder(BaseModel):
-    cards: list[Dict[str, Any]] = Field(default_factory=list)
+    cards: list[CardPosition] = Field(default_factory=list)
+
+class ReorderResult(BaseModel):
+    message: str
+    ids: list[str] = Field(default_factory=list)
 
 class Card(CardBase):
     id: str
-    position: int
+    position: float
     created_at: datetime = Field(alias="createdAt")
     updated_at: Optional[datetime] = Field(None, alias="updatedAt")
     labels: list[CardLabel] = Field(default_factory=list)
     members: list[CardMember] = Field(default_factory=list)
     checklists: list[Checklist] = Field(default_factory=list)
     attachments: list[Attachment] = Field(default_factory=list)
-    comments: list[Comment] = Field(default_factory=list)
     list: Optional[ListRef] = None
+    archived_at: Optional[datetime] = Field(None, alias="archivedAt")
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
-class CardInList(CardBase):
+# An archived card in a board's archive listing; restore it to see the rest
+class ArchivedCard(BaseModel):
     id: str
-    position: int
+    title: str
+    list_id: str = Field(alias="listId")
+    archived_at: datetime = Field(alias="archivedAt")
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+class CardBadges(BaseModel):
+    comments: int = 0
+    attachments: int = 0
+    checklist_items: int = Field(0, alias="checklistItems")
+    checklist_items_completed: int = Field(0, alias="checklistItemsCompleted")
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+# Compact card for the board view; the full card comes from GET /api/cards/{id}
+class CardInList(BaseModel):
+    id: str
+    title: str
+    list_id: str = Field(alias="listId")
+    position: float
+    due_date: Optional[datetime] = Field(None, alias="dueDate")
+    cover_image: Optional[str] = Field(None, alias="coverImage")
+    cover_thumbnail: Optional[str] = Field(None, alias="coverThumbnail")
     created_at: datetime = Field(alias="createdAt")
     updated_at: Optional[datetime] = Field(None, alias="updatedAt")
+    label_ids: list[str] = Field(default_factory=list, alias="labelIds")
+    member_ids: list[str] = Field(default_factory=list, alias="memberIds")
+    badges: CardBadges = Field(default_factory=CardBadges)
 
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
@@ -252,17 +333,43 @@ class Attachment(BaseModel):
     url: str
     type: str
     size: Optional[int] = None
+    thumbnail_url: Optional[str] = Field(None, alias="thumbnailUrl")
+    preview_url: Optional[str] = Field(None, alias="previewUrl")
     card_id: str = Field(alias="cardId")
     created_at: datetime = Field(alias="createdAt")
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
+# Batch schemas
+MAX_BATCH_OPERATIONS = 100
+
+class BatchOperation(BaseModel):
+    method: Literal["POST", "PUT", "DELETE"]
+    # Same path the route is served at, e.g. "/cards/{id}/move" ("/api" optional)
+    path: str
+    body: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+class BatchOperationResult(BaseModel):
+    status: int
+    body: Any = None
+
+class BatchResult(BaseModel):
+    results: list[BatchOperationResult] = Field(default_factory=list)
+
 # Rebuild models to resolve forward references after all classes are defined
 def _rebuild_models():
     Board.model_rebuild()
+    BoardSummary.model_rebuild()
+    BoardRef.model_rebuild()
+    DeletedIds.model_rebuild()
+    BoardDelta.model_rebuild()
     List.model_rebuild()
     ListRef.model_rebuild()
     Card.model_rebuild()
+    CardBadges.model_rebuild()
     CardInList.model_rebuild()
     Label.model_rebuild()
     CardLabel.model_rebuild()
@@ -271,6 +378,10 @@ def _rebuild_models():
     Checklist.model_rebuild()
     Comment.model_rebuild()
     Attachment.model_rebuild()
+    BatchOperation.model_rebuild()
+    BatchRequest.model_rebuild()
+    BatchOperationResult.model_rebuild()
+    BatchResult.model_rebuild()
     User.model_rebuild()
 
 _rebuild_models()
@@ -0,0 +1,228 @@
+"""
+Full-text search over card titles, descriptions, comments and checklist items.
+
+Every searchable row is one document in `search_documents`, tagged with its
+kind, its own id and the card it belongs to. SQLite keeps the text in an FTS5
+table keyed by the document rowid; PostgreSQL keeps a weighted tsvector with a
+GIN index. Both expose `matches(q)`, a subquery of (card_id, score) where a
+lower score is a better match, so the search router can join and filter it
+like any other table.
+"""
+import re
+from sqlalchemy import Float, String, bindparam, column, delete, func, insert, inspect, literal, literal_column, select, table, text, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import async_engine
+from app.ids import ID
+from app import models
+
+CARD = "card"
+COMMENT = "comment"
+CHECKLIST_ITEM = "checklist_item"
+
+def _terms(q: str):
+    return re.findall(r"\w+", q)
+
+class SearchIndex:
+    def create_schema(self, conn) -> bool:
+        """Create the index tables if missing; returns True if they were created"""
+        raise NotImplementedError
+
+    def rebuild(self, conn):
+        """Reindex every card, comment and checklist item from scratch"""
+        raise NotImplementedError
+
+    async def upsert(self, db: AsyncSession, kind: str, entity_id: str, card_id: str, title: str, body: str):
+        raise NotImplementedError
+
+    async def delete_where(self, db: AsyncSession, *criteria):
+        raise NotImplementedError
+
+    def matches(self, q: str):
+        """Subquery of (card_id, score) for cards matching q, or None if q has no terms"""
+        raise NotImplementedError
+
+    def ensure_schema(self, conn):
+        """Create and populate the index for an existing database that lacks one"""
+        if not inspect(conn).has_table(models.Card.__tablename__):
+            return
+        if self.create_schema(conn):
+            self.rebuild(conn)
+
+    async def index_card(self, db: AsyncSession, card: models.Card):
+        await self.upsert(db, CARD, card.id, card.id, card.title, card.description or "")
+
+    async def index_comment(self, db: AsyncSession, comment: models.Comment):
+        await self.upsert(db, COMMENT, comment.id, comment.card_id, "", comment.text)
+
+    async def index_checklist_item(self, db: AsyncSession, item: models.ChecklistItem, card_id: str):
+        await self.upsert(db, CHECKLIST_ITEM, item.id, card_id, "", item.text)
+
+    async def remove(self, db: AsyncSession, kind: str, entity_id: str):
+        await self.delete_where(db, documents.c.kind == kind, documents.c.entity_id == entity_id)
+
+    async def remove_checklist_items(self, db: AsyncSession, checklist_id: str):
+        item_ids = select(models.ChecklistItem.id).where(models.ChecklistItem.checklist_id == checklist_id)
+        await self.delete_where(db, documents.c.kind == CHECKLIST_ITEM, documents.c.entity_id.in_(item_ids))
+
+    async def remove_cards(self, db: AsyncSession, card_ids):
+        """Drop every document belonging to the given card ids (a list or a SELECT)"""
+        await self.delete_where(db, documents.c.card_id.in_(card_ids))
+
+    def _sources(self):
+        # (kind, entity_id, card_id, title, body) for everything that's searchable
+        return union_all(
+            select(literal(CARD), models.Card.id, models.Card.id, models.Card.title, func.coalesce(models.Card.description, "")),
+            select(literal(COMMENT), models.Comment.id, models.Comment.card_id, literal(""), models.Comment.text),
+            select(literal(CHECKLIST_ITEM), models.ChecklistItem.id, models.Checklist.card_id, literal(""), models.ChecklistItem.text)
+            .join(models.Checklist, models.Checklist.id == models.ChecklistItem.checklist_id),
+        ).subquery()
+
+documents = table(
+    "search_documents",
+    column("id"),
+    column("kind", String),
+    column("entity_id", ID),
+    column("card_id", ID),
+    column("document", TSVECTOR),
+)
+
+class Fts5SearchIndex(SearchIndex):
+    fts = table("search_fts", column("rowid"), column("title", String), column("body", String))
+
+    def create_schema(self, conn) -> bool:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'")
+        ).first()
+        if exists:
+            return False
+        id_type = ID.compile(dialect=conn.dialect)
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            f"id INTEGER PRIMARY KEY, kind VARCHAR NOT NULL, entity_id {id_type} NOT NULL, "
+            f"card_id {id_type} NOT NULL, UNIQUE (kind, entity_id))"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_card_id ON search_documents (card_id)"
+        ))
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE search_fts USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        return True
+
+    def rebuild(self, conn):
+        conn.execute(delete(self.fts))
+        conn.execute(delete(documents))
+        sources = self._sources()
+        conn.execute(insert(documents).from_select(
+            ["kind", "entity_id", "card_id"],
+            select(sources.c[0], sources.c[1], sources.c[2]),
+        ))
+        conn.execute(insert(self.fts).from_select(
+            ["rowid", "title", "body"],
+            select(documents.c.id, sources.c[3], sources.c[4]).join(
+                sources, (documents.c.kind == sources.c[0]) & (documents.c.entity_id == sources.c[1])
+            ),
+        ))
+
+    async def upsert(self, db, kind, entity_id, card_id, title, body):
+        doc_id = await db.scalar(text(
+            "INSERT INTO search_documents (kind, entity_id, card_id) VALUES (:kind, :entity_id, :card_id) "
+            "ON CONFLICT (kind, entity_id) DO UPDATE SET card_id = excluded.card_id RETURNING id"
+        ).bindparams(bindparam("entity_id", type_=ID), bindparam("card_id", type_=ID)),
+            {"kind": kind, "entity_id": entity_id, "card_id": card_id})
+        await db.execute(text(
+            "INSERT OR REPLACE INTO search_fts (rowid, title, body) VALUES (:id, :title, :body)"
+        ), {"id": doc_id, "title": title, "body": body})
+
+    async def delete_where(self, db, *criteria):
+        doc_ids = select(documents.c.id).where(*criteria)
+        await db.execute(delete(self.fts).where(self.fts.c.rowid.in_(doc_ids)))
+        await db.execute(delete(documents).where(*criteria))
+
+    def matches(self, q: str):
+        if not _terms(q):
+            return None
+        # Every term must match, each as a prefix
+        query = " ".join(f'"{term}"*' for term in _terms(q))
+        fts_table = literal_column("search_fts")
+        # bm25() can't be called once the query is flattened into joins and
+        # aggregates, but the rank column can. Title hits weigh ten times body
+        # hits; bm25 is negative, lower is better.
+        rank = literal_column("rank", Float)
+        ranked = (
+            select(self.fts.c.rowid.label("doc_id"), rank.label("score"))
+            .where(fts_table.op("MATCH")(query), rank.op("MATCH")("bm25(10.0, 1.0)"))
+            .subquery()
+        )
+        return (
+            select(documents.c.card_id.label("card_id"), func.min(ranked.c.score).label("score"))
+            .join(ranked, ranked.c.doc_id == documents.c.id)
+            .group_by(documents.c.card_id)
+            .subquery()
+        )
+
+class PostgresSearchIndex(SearchIndex):
+    config = "simple"
+
+    def _vector(self, title, body):
+        return func.setweight(func.to_tsvector(self.config, title), "A").op("||")(
+            func.setweight(func.to_tsvector(self.config, body), "B")
+        )
+
+    def create_schema(self, conn) -> bool:
+        exists = conn.execute(text("SELECT to_regclass('search_documents')")).scalar()
+        if exists:
+            return False
+        id_type = ID.compile(dialect=conn.dialect)
+        conn.execute(text(
+            "CREATE TABLE search_documents ("
+            f"kind VARCHAR NOT NULL, entity_id {id_type} NOT NULL, card_id {id_type} NOT NULL, "
+            "document TSVECTOR NOT NULL, PRIMARY KEY (kind, entity_id))"
+        ))
+        conn.execute(text("CREATE INDEX ix_search_documents_card_id ON search_documents (card_id)"))
+        conn.execute(text("CREATE INDEX ix_search_documents_document ON search_documents USING GIN (document)"))
+        return True
+
+    def rebuild(self, conn):
+        conn.execute(delete(documents))
+        sources = self._sources()
+        conn.execute(insert(documents).from_select(
+            ["kind", "entity_id", "card_id", "document"],
+            select(sources.c[0], sources.c[1], sources.c[2], self._vector(sources.c[3], sources.c[4])),
+        ))
+
+    async def upsert(self, db, kind, entity_id, card_id, title, body):
+        stmt = pg_insert(documents).values(
+            kind=kind, entity_id=entity_id, card_id=card_id, document=self._vector(title, body)
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["kind", "entity_id"],
+            set_={"card_id": stmt.excluded.card_id, "document": stmt.excluded.document},
+        ))
+
+    async def delete_where(self, db, *criteria):
+        await db.execute(delete(documents).where(*criteria))
+
+    def matches(self, q: str):
+        if not _terms(q):
+            return None
+        # Every term must match, each as a prefix
+        tsquery = func.to_tsquery(self.config, " & ".join(f"{term}:*" for term in _terms(q)))
+        return (
+            select(
+                documents.c.card_id.label("card_id"),
+                (-func.max(func.ts_rank(documents.c.document, tsquery))).label("score"),
+            )
+            .where(documents.c.document.op("@@")(tsquery))
+            .group_by(documents.c.card_id)
+            .subquery()
+        )
+
+def for_dialect(name: str) -> SearchIndex:
+    if name == "postgresql":
+        return PostgresSearchIndex()
+    return Fts5SearchIndex()
+
+search_index = for_dialect(async_engine.dialect.name)
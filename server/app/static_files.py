@@ -0,0 +1,165 @@
+"""
+Serving /uploads.
+
+Every stored file name is unique, and content-addressed ones are named after
+their SHA-256, so responses are cacheable forever and the hash doubles as a
+strong ETag. Range requests are honoured (single ranges; PDFs and video seek
+with them), as are If-None-Match and If-Range.
+
+Bytes leave the process as cheaply as the deployment allows:
+- with UPLOADS_ACCEL_REDIRECT=/internal-prefix/, the response is only headers
+  plus X-Accel-Redirect, and a fronting nginx serves the file itself
+- servers offering the ASGI zero-copy send extension get the open file and
+  hand it to sendfile(2)
+- servers offering the path send extension get the path, for whole files
+- otherwise the file is streamed in chunks read on the threadpool
+"""
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from stat import S_ISREG
+from typing import Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+# Names never get new content, so clients and proxies may keep them forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+CHUNK_SIZE = 256 * 1024
+
+ACCEL_REDIRECT = os.getenv("UPLOADS_ACCEL_REDIRECT")
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+def _etag(relative: str, stat: os.stat_result) -> str:
+    stem = os.path.splitext(os.path.basename(relative))[0]
+    if _SHA256.fullmatch(stem):
+        # thumbs/<size>/... derive from the original's hash
+        parts = relative.split("/")
+        return f'"{parts[1]}-{stem}"' if parts[0] == "thumbs" else f'"{stem}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+def _byte_range(header: Optional[str], size: int) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """((start, end) inclusive or None for the whole file, satisfiable)"""
+    match = _RANGE.fullmatch(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        # Absent, malformed or several ranges: ignoring Range is always allowed
+        return None, True
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None, True
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        return None, False
+    return (start, end), True
+
+class UploadFiles:
+    """ASGI app serving the files under `directory`"""
+
+    def __init__(self, directory: str, accel_redirect: Optional[str] = ACCEL_REDIRECT):
+        self.directory = os.path.realpath(directory)
+        self.accel_redirect = accel_redirect
+
+    def _resolve(self, path: str) -> Optional[str]:
+        relative = path.lstrip("/")
+        # Dotfiles are uploads and renders still being written
+        if not relative or any(part.startswith(".") or part == "" for part in relative.split("/")):
+            return None
+        full = os.path.realpath(os.path.join(self.directory, relative))
+        if os.path.commonpath([full, self.directory]) != self.directory:
+            return None
+        return relative
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_empty(send, 405, {"Allow": "GET, HEAD"})
+            return
+        # Under a Mount, "path" is what follows the mount point
+        relative = self._resolve(scope["path"])
+        full = relative and os.path.join(self.directory, relative)
+        try:
+            stat = await anyio.to_thread.run_sync(os.stat, full) if full else None
+        except (FileNotFoundError, NotADirectoryError):
+            stat = None
+        if stat is None or not S_ISREG(stat.st_mode):
+            await self._send_empty(send, 404, {"Content-Type": "text/plain"}, b"Not Found")
+            return
+
+        request_headers = Headers(scope=scope)
+        tag = _etag(relative, stat)
+        headers = {
+            "Cache-Control": CACHE_CONTROL,
+            "ETag": tag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Content-Type": mimetypes.guess_type(relative)[0] or "application/octet-stream",
+            "X-Content-Type-Options": "nosniff",
+        }
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or tag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))):
+            await self._send_empty(send, 304, headers, length=False)
+            return
+
+        if self.accel_redirect:
+            # The proxy does ranges and sendfile; it keeps these headers
+            headers["X-Accel-Redirect"] = self.accel_redirect.rstrip("/") + "/" + relative
+            await self._send_empty(send, 200, headers)
+            return
+
+        size = stat.st_size
+        byte_range, satisfiable = _byte_range(request_headers.get("range"), size)
+        if_range = request_headers.get("if-range")
+        if if_range is not None and if_range.strip() != tag:
+            byte_range, satisfiable = None, True
+        if not satisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            await self._send_empty(send, 416, headers)
+            return
+        status, start, end = 200, 0, size - 1
+        if byte_range:
+            status, (start, end) = 206, byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        count = end - start + 1
+        headers["Content-Length"] = str(count)
+
+        await send({"type": "http.response.start", "status": status, "headers": _encode(headers)})
+        if scope["method"] == "HEAD" or count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(full, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": start, "count": count})
+        elif "http.response.pathsend" in extensions and status == 200:
+            await send({"type": "http.response.pathsend", "path": full})
+        else:
+            await self._stream(send, full, start, count)
+
+    async def _stream(self, send: Send, path: str, offset: int, count: int):
+        async with await anyio.open_file(path, "rb") as file:
+            await file.seek(offset)
+            while count > 0:
+                chunk = await file.read(min(CHUNK_SIZE, count))
+                if not chunk:
+                    break
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+        if count > 0:
+            # Truncated underneath us; end the response rather than hang
+            await send({"type": "http.response.body", "body": b""})
+
+    async def _send_empty(self, send: Send, status: int, headers: dict, body: bytes = b"", length: bool = True):
+        if length:
+            headers = {**headers, "Content-Length": str(len(body))}
+        await send({"type": "http.response.start", "status": status, "headers": _encode(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+def _encode(headers: dict):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
@@ -0,0 +1,245 @@
+"""
+Content-addressed attachment storage.
+
+Uploaded files are stored once per content: the key is the SHA-256 of the
+bytes (plus an extension for the declared type), sharded two levels deep so no
+directory grows unbounded. Uploading a file that's already stored costs a
+hash and a row, not another copy.
+
+Each stored file has a `blobs` row, and attachments point at it by key. A blob
+is referenced by however many attachment rows name it, so removing one (or a
+card, list or board, which cascade to their attachments) only releases the
+key; after commit, keys nobody references any more are deleted and their files
+removed. The row delete and the file removal share a transaction. Uploads
+store the file first, outside any transaction, then claim the row and check
+the file is still there before committing, so an upload racing the collector
+either keeps the blob alive or fails and can be retried; a failed upload
+abandons its key for the collector to remove if nothing else uses it.
+
+The files live in a BlobStore: a local directory served under /uploads by
+default, or an S3-compatible bucket with ATTACHMENT_STORAGE_URL=s3://bucket/prefix
+(S3_ENDPOINT_URL points it at MinIO, LocalStack or any other stand-in).
+"""
+import asyncio
+import mimetypes
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Iterable, List
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import AsyncSessionLocal, async_engine
+from app import models
+
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
+
+# Keys never change content, so anything serving them may cache forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def blob_key(sha256: str, content_type: str) -> str:
+    """Storage key for content with this digest, e.g. "ab/cd/abcd...ef.png" """
+    extension = mimetypes.guess_extension(content_type) or ""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class BlobStore:
+    # Where uploads are spooled before put(); on the store's filesystem when
+    # it has one, so keeping a file is a rename
+    staging_dir: str
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def put(self, key: str, path: str, content_type: str):
+        """Store the file at `path` under `key`, consuming it; a no-op copy if the key exists"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    def local_copy(self, key: str):
+        """Async context manager yielding a local path with the stored file"""
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str, base_url: str = "/uploads"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        self.staging_dir = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _put(self, key: str, path: str):
+        destination = self.path(key)
+        if os.path.exists(destination):
+            _remove(path)
+            return
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(path, destination)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(os.path.exists, self.path(key))
+
+    async def put(self, key: str, path: str, content_type: str):
+        await run_in_threadpool(self._put, key, path)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(_remove, self.path(key))
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        yield self.path(key)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+class S3BlobStore(BlobStore):
+    """Works with any client exposing boto3's S3 list_objects_v2, upload_file, download_file and delete_object"""
+
+    def __init__(self, client, bucket: str, public_url: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/")
+        self.prefix = prefix.strip("/")
+        self.staging_dir = tempfile.gettempdir()
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _exists(self, key: str) -> bool:
+        # Listing needs no error handling for the missing case, unlike HEAD
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=self.object_key(key), MaxKeys=1)
+        return any(item["Key"] == self.object_key(key) for item in response.get("Contents", []))
+
+    def _put(self, key: str, path: str, content_type: str):
+        try:
+            if not self._exists(key):
+                self.client.upload_file(path, self.bucket, self.object_key(key), ExtraArgs={
+                    "ContentType": content_type,
+                    "CacheControl": IMMUTABLE,
+                })
+        finally:
+            _remove(path)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self._exists, key)
+
+    async def put(self, key: str, path: str, content_type: str):
+        await run_in_threadpool(self._put, key, path, content_type)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=self.object_key(key))
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        fd, path = tempfile.mkstemp(dir=self.staging_dir, prefix=".download-")
+        os.close(fd)
+        try:
+            await run_in_threadpool(self.client.download_file, self.bucket, self.object_key(key), path)
+            yield path
+        finally:
+            await run_in_threadpool(_remove, path)
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{self.object_key(key)}"
+
+def from_env() -> BlobStore:
+    url = os.getenv("ATTACHMENT_STORAGE_URL", "local")
+    if url.startswith("s3://"):
+        import boto3
+        bucket, _, prefix = url.removeprefix("s3://").partition("/")
+        endpoint = os.getenv("S3_ENDPOINT_URL")
+        public_url = os.getenv("ATTACHMENT_PUBLIC_URL") or (
+            f"{endpoint.rstrip('/')}/{bucket}" if endpoint else f"https://{bucket}.s3.amazonaws.com"
+        )
+        return S3BlobStore(boto3.client("s3", endpoint_url=endpoint), bucket, public_url, prefix)
+    return LocalBlobStore(UPLOAD_DIR)
+
+blob_store = from_env()
+
+_insert = pg_insert if async_engine.dialect.name == "postgresql" else sqlite_insert
+
+async def claim(db: AsyncSession, key: str, size: int, content_type: str):
+    """Make sure `key` has a blobs row before an attachment references it"""
+    await db.execute(
+        _insert(models.Blob)
+        .values(key=key, size=size, content_type=content_type)
+        .on_conflict_do_nothing(index_elements=[models.Blob.key])
+    )
+
+async def release(db: AsyncSession, keys):
+    """
+    Note blobs whose references this transaction removes, given as keys or a
+    SELECT of keys; run it before the delete, while the rows still exist.
+    Unreferenced ones are collected once it commits.
+    """
+    if not isinstance(keys, (list, tuple, set)):
+        keys = (await db.execute(keys)).scalars().all()
+    db.info.setdefault("released_blobs", set()).update(key for key in keys if key)
+
+async def abandon(key: str, size: int, content_type: str):
+    """Collect `key` if nothing references it, e.g. after a failed upload stored its file"""
+    async with AsyncSessionLocal() as db:
+        await claim(db, key, size, content_type)
+        await release(db, [key])
+        await db.commit()
+
+_collect_hooks = []
+
+def on_collect(hook: Callable[[str], Awaitable[None]]):
+    """Run `await hook(key)` for each blob collected, to remove files derived from it"""
+    _collect_hooks.append(hook)
+    return hook
+
+async def collect(keys: Iterable[str]):
+    """Delete the blobs among `keys` that no attachment or archived card references, and their files"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(models.Blob)
+            .where(models.Blob.key.in_(list(keys)))
+            .where(~exists().where(models.Attachment.blob_key == models.Blob.key))
+            # Archived cards' attachments keep theirs, see app/archive.py
+            .where(~exists().where(models.CardArchiveBlob.blob_key == models.Blob.key))
+            .returning(models.Blob.key),
+            execution_options={"synchronize_session": False},
+        )
+        # Removed before the rows commit, so an upload that finds no row
+        # after this also finds no file and stores it again
+        for key in result.scalars().all():
+            await blob_store.delete(key)
+            for hook in _collect_hooks:
+                await hook(key)
+        await db.commit()
+
+_pending = set()
+
+@event.listens_for(Session, "after_commit")
+def _collect_released(session):
+    released: List[str] = list(session.info.pop("released_blobs", ()))
+    if not released:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(collect(released))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_released(session):
+    session.info.pop("released_blobs", None)
@@ -0,0 +1,150 @@
+"""
+Downscaled copies of image attachments.
+
+After an image upload commits, a small worker pool renders a "thumbnail"
+(board covers) and a "preview" (card detail) from the stored original and
+writes them to the blob store next to it. The attachment rows sharing that
+blob get `thumbnail_url` and `preview_url`, and their boards move a version so
+clients pick them up. Board payloads carry a card's cover thumbnail when its
+cover is an attachment that has one; the original stays at the attachment url.
+
+Thumbnails are keyed by the original's content hash, so identical uploads
+share them and they're removed when the original is collected. Rendering
+needs Pillow, which requirements.txt installs; without it attachments keep
+only their original and a warning says so at startup. Rendering failures are
+logged rather than lost with their task.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from sqlalchemy import select, update
+from app.database import AsyncSessionLocal
+from app import events, models, storage, versioning
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+    logger.warning("Pillow isn't installed; image attachments won't get thumbnails")
+
+# Longest edge, in pixels, of each size kept; original is never upscaled
+THUMBNAIL_SIZES = {"thumbnail": 320, "preview": 1280}
+
+# Decoding and resizing mostly release the GIL, so threads run them in
+# parallel; a pool of their own keeps them off the request threadpool
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+IMAGE_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_running: Dict[str, asyncio.Task] = {}
+
+def available() -> bool:
+    return Image is not None
+
+def _output_format():
+    # WebP is much smaller at the same quality, when Pillow was built with it
+    if features.check("webp"):
+        return "WEBP", ".webp", "image/webp"
+    return "JPEG", ".jpg", "image/jpeg"
+
+def thumbnail_key(key: str, size: str, extension: Optional[str] = None) -> str:
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    return f"thumbs/{size}/{stem}{extension or _output_format()[1]}"
+
+def _render(source: str, directory: str, sizes: List[str]) -> Dict[str, str]:
+    """Write each size of the image at `source` to a temp file; {} if it isn't one Pillow reads"""
+    image_format, extension, _ = _output_format()
+    largest = max(THUMBNAIL_SIZES[size] for size in sizes)
+    rendered = {}
+    try:
+        with Image.open(source) as image:
+            # Lets JPEG decode straight to a reduced scale
+            image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha and image_format == "WEBP" else "RGB")
+            for size in sorted(sizes, key=THUMBNAIL_SIZES.get, reverse=True):
+                edge = THUMBNAIL_SIZES[size]
+                image.thumbnail((edge, edge), Image.LANCZOS)
+                fd, path = tempfile.mkstemp(dir=directory, prefix=".thumb-", suffix=extension)
+                with os.fdopen(fd, "wb") as out:
+                    image.save(out, image_format, quality=80)
+                rendered[size] = path
+    except (OSError, ValueError, Image.DecompressionBombError):
+        for path in rendered.values():
+            os.remove(path)
+        return {}
+    return rendered
+
+async def _generate(key: str):
+    global _executor
+    blob_store = storage.blob_store
+    content_type = _output_format()[2]
+    missing = [size for size in THUMBNAIL_SIZES if not await blob_store.exists(thumbnail_key(key, size))]
+    if missing:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(THUMBNAIL_WORKERS, thread_name_prefix="thumbnails")
+        async with blob_store.local_copy(key) as source:
+            rendered = await asyncio.get_running_loop().run_in_executor(
+                _executor, _render, source, blob_store.staging_dir, missing,
+            )
+        if not rendered:
+            return
+        for size, path in rendered.items():
+            await blob_store.put(thumbnail_key(key, size), path, content_type)
+
+    async with AsyncSessionLocal() as db:
+        card_ids = (await db.execute(
+            select(models.Attachment.card_id).where(models.Attachment.blob_key == key)
+        )).scalars().all()
+        if not card_ids:
+            # Every attachment went while we rendered; don't leave these behind
+            await _remove_thumbnails(key)
+            return
+        urls = {
+            "thumbnail_url": blob_store.url(thumbnail_key(key, "thumbnail")),
+            "preview_url": blob_store.url(thumbnail_key(key, "preview")),
+        }
+        await versioning.touch(db, select(models.List.board_id).join(models.Card).where(models.Card.id.in_(card_ids)))
+        await db.execute(
+            update(models.Attachment).where(models.Attachment.blob_key == key).values(**urls),
+            execution_options={"synchronize_session": False},
+        )
+        versioning.record(db, "card", *card_ids)
+        events.emit(db, "attachment.thumbnails", cardIds=list(card_ids), thumbnailUrl=urls["thumbnail_url"], previewUrl=urls["preview_url"])
+        await db.commit()
+
+def schedule(key: str, content_type: str):
+    """Render thumbnails for a just-committed upload in the background"""
+    if not available() or content_type not in IMAGE_TYPES or key in _running:
+        return
+    task = asyncio.get_running_loop().create_task(_generate(key))
+    _running[key] = task
+    task.add_done_callback(lambda task: _finished(key, task))
+
+def _finished(key: str, task: asyncio.Task):
+    _running.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Rendering thumbnails for %s failed", key, exc_info=task.exception())
+
+async def existing(db, key: str):
+    """(thumbnail_url, preview_url) already made for this content, if any"""
+    result = await db.execute(
+        select(models.Attachment.thumbnail_url, models.Attachment.preview_url)
+        .where(models.Attachment.blob_key == key, models.Attachment.thumbnail_url.is_not(None))
+        .limit(1)
+    )
+    return result.first()
+
+@storage.on_collect
+async def _remove_thumbnails(key: str):
+    # Either format, since that depends on how Pillow was built when they were made
+    for size in THUMBNAIL_SIZES:
+        for extension in (".webp", ".jpg"):
+            await storage.blob_store.delete(thumbnail_key(key, size, extension))
@@ -0,0 +1,189 @@
+"""
+Streaming attachment uploads.
+
+The multipart body is parsed as it arrives rather than spooled whole by the
+form parser first. The file part is hashed and counted on the fly, written to
+a temporary file next to its destination on a worker thread, and only renamed
+into place once complete, so readers never see a partial file. An upload is
+refused as soon as it crosses MAX_UPLOAD_BYTES, or its declared type isn't
+allowed, without reading the rest of it.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Collection, Optional
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+
+# Data is handed to the writer thread in pieces about this big
+CHUNK_SIZE = 256 * 1024
+
+# Multipart boundaries and part headers on top of the file itself
+FORM_OVERHEAD = 16 * 1024
+
+# For the OpenAPI docs, since the route reads the body itself
+def openapi_body(field_name: str = "file") -> dict:
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {field_name: {"type": "string", "format": "binary"}},
+        "required": [field_name],
+    }}}}}
+
+@dataclass
+class ReceivedFile:
+    """A fully received upload, waiting in a temporary file to be kept or discarded"""
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    temp_path: str
+
+    async def discard(self):
+        await run_in_threadpool(_remove, self.temp_path)
+
+@dataclass
+class _Part:
+    headers: dict = field(default_factory=dict)
+    header_name: bytes = b""
+    header_value: bytes = b""
+    is_file: bool = False
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+class _FileWriter:
+    def __init__(self, directory: str):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        self.file = os.fdopen(fd, "wb")
+        self.digest = hashlib.sha256()
+
+    def write(self, data: bytes):
+        # hashlib and file writes release the GIL, so this runs off the loop
+        self.digest.update(data)
+        self.file.write(data)
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def discard(self):
+        self.file.close()
+        _remove(self.path)
+
+async def receive_file(
+    request: Request,
+    directory: str,
+    field_name: str = "file",
+    allowed_types: Optional[Collection[str]] = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> ReceivedFile:
+    """Stream the `field_name` file of a multipart request into `directory`"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes + FORM_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte limit")
+
+    # Parser callbacks are synchronous; they queue work that's awaited per chunk
+    events = []
+    part = _Part()
+
+    def on_part_begin():
+        nonlocal part
+        part = _Part()
+
+    def on_header_field(data, start, end):
+        part.header_name += data[start:end]
+
+    def on_header_value(data, start, end):
+        part.header_value += data[start:end]
+
+    def on_header_end():
+        part.headers[part.header_name.lower()] = part.header_value
+        part.header_name = part.header_value = b""
+
+    def on_headers_finished():
+        events.append(("headers", part))
+
+    def on_part_data(data, start, end):
+        events.append(("data", (part, data[start:end])))
+
+    def on_part_end():
+        events.append(("end", part))
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    writer = None
+    received = None
+    filename = file_type = ""
+    size = 0
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in events:
+                if kind == "headers":
+                    _, options = parse_options_header(value.headers.get(b"content-disposition", b""))
+                    if received or writer or b"filename" not in options or _decode(options.get(b"name", b"")) != field_name:
+                        continue
+                    filename = _decode(options[b"filename"])
+                    file_type = _decode(value.headers.get(b"content-type", b"application/octet-stream"))
+                    if allowed_types is not None and file_type not in allowed_types:
+                        raise HTTPException(status_code=400, detail="Invalid file type")
+                    writer = await run_in_threadpool(_FileWriter, directory)
+                    value.is_file = True
+                elif kind == "data":
+                    data_part, value = value
+                    if not data_part.is_file:
+                        continue
+                    size += len(value)
+                    if size > max_bytes:
+                        raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte limit")
+                    pending += value
+                    if len(pending) >= CHUNK_SIZE:
+                        await run_in_threadpool(writer.write, bytes(pending))
+                        pending.clear()
+                elif kind == "end" and value.is_file:
+                    if pending:
+                        await run_in_threadpool(writer.write, bytes(pending))
+                        pending.clear()
+                    await run_in_threadpool(writer.close)
+                    received = ReceivedFile(filename, file_type, size, writer.digest.hexdigest(), writer.path)
+                    writer = None
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        # Includes the client going away mid-upload
+        if writer is not None:
+            await run_in_threadpool(writer.discard)
+        if received is not None:
+            await received.discard()
+        raise
+    if received is None:
+        if writer is not None:
+            await run_in_threadpool(writer.discard)
+        raise HTTPException(status_code=422, detail=f"No '{field_name}' file in the upload")
+    return received
@@ -0,0 +1,160 @@
+"""
+Board version counters and conditional GETs.
+
+Every write to a board's lists, cards, labels or card details bumps
+`boards.version` in the same transaction, including writes no request asked
+for directly, such as app/ranking.py renumbering positions. Reads derive a
+strong ETag from that version, so a client revalidating with If-None-Match
+costs one indexed lookup and a 304 instead of loading and serializing the
+board.
+
+Writes also name the entities they changed with `record()`. Those land in the
+board_changes log at the new version, so a client that last saw version N can
+ask for just what changed since then instead of the whole tree.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import delete, event, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app import models
+
+# Browsers may cache the body but must revalidate it before every use
+CACHE_CONTROL = "no-cache"
+
+# Change log operations
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Log entries kept per board; older `since` values get a full resync instead
+CHANGE_LOG_DEPTH = 1000
+# Boards are trimmed back to CHANGE_LOG_DEPTH once every this many versions
+CHANGE_LOG_PRUNE_EVERY = 100
+
+def board_of_list(list_id):
+    return select(models.List.board_id).where(models.List.id == list_id)
+
+def board_of_card(card_id):
+    return (
+        select(models.List.board_id)
+        .join(models.Card, models.Card.list_id == models.List.id)
+        .where(models.Card.id == card_id)
+    )
+
+def board_of_checklist(checklist_id):
+    return (
+        select(models.List.board_id)
+        .join(models.Card, models.Card.list_id == models.List.id)
+        .join(models.Checklist, models.Checklist.card_id == models.Card.id)
+        .where(models.Checklist.id == checklist_id)
+    )
+
+class BoardChanges:
+    """What the current transaction did to boards: new versions, entities and events"""
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.entities: Dict[Tuple[str, str], str] = {}
+        self.events: List[Tuple[str, dict]] = []
+
+def changes(db) -> BoardChanges:
+    return db.info.setdefault("board_changes", BoardChanges())
+
+async def touch(db: AsyncSession, *boards):
+    """
+    Bump the version of each board, given as ids or SELECTs of board ids.
+
+    The new versions are recorded in changes(db) for the on_commit hooks.
+    A board moves up one version per transaction however often it's touched,
+    so the change log has an entry at every version.
+    """
+    versions = changes(db).versions
+    criteria = [models.Board.id.in_([board] if isinstance(board, str) else board) for board in boards]
+    result = await db.execute(
+        update(models.Board)
+        .where(or_(*criteria), models.Board.id.not_in(list(versions)))
+        # Keep updated_at for edits to the board itself
+        .values(version=models.Board.version + 1, updated_at=models.Board.updated_at)
+        .returning(models.Board.id, models.Board.version),
+        execution_options={"synchronize_session": False},
+    )
+    versions.update(result.tuples().all())
+
+def record(db, entity: str, *entity_ids: str, op: str = UPSERT):
+    """
+    Log that this transaction changed (or, with op=DELETE, removed) entities.
+
+    `entity` is "board", "list", "card" or "label"; edits to a card's details
+    are logged against the card. Entries are written at commit time against
+    every board the transaction touched, at its final version.
+    """
+    entities = changes(db).entities
+    for entity_id in entity_ids:
+        entities[(entity, entity_id)] = op
+
+@event.listens_for(Session, "before_commit")
+def _write_change_log(session):
+    pending = session.info.get("board_changes")
+    if not pending or not pending.versions or not pending.entities:
+        return
+    session.execute(insert(models.BoardChange), [
+        {"board_id": board_id, "version": version, "entity": entity, "entity_id": entity_id, "op": op}
+        for board_id, version in pending.versions.items()
+        for (entity, entity_id), op in pending.entities.items()
+    ])
+    for board_id, version in pending.versions.items():
+        if version % CHANGE_LOG_PRUNE_EVERY == 0:
+            session.execute(
+                delete(models.BoardChange)
+                .where(models.BoardChange.board_id == board_id)
+                .where(models.BoardChange.version <= version - CHANGE_LOG_DEPTH)
+            )
+
+_commit_hooks = []
+_pending = set()
+
+def on_commit(hook: Callable[[BoardChanges], Awaitable[None]]):
+    """Run `await hook(changes)` after each commit that touched boards"""
+    _commit_hooks.append(hook)
+    return hook
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_hooks(session):
+    committed = session.info.pop("board_changes", None)
+    if not committed or not committed.versions:
+        return
+    # Commit events are synchronous; hand the hooks to the running loop.
+    # Sync tooling without a loop has no caches or subscribers to notify.
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    for hook in _commit_hooks:
+        task = loop.create_task(hook(committed))
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("board_changes", None)
+
+def etag(kind: str, entity_id: str, version: int) -> str:
+    return f'"{kind}-{entity_id}-{version}"'
+
+def _matches(request: Request, tag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in header.split(","))
+
+def conditional(request: Request, response: Response, tag: str) -> Optional[Response]:
+    """Return a 304 if the client already has `tag`, else stamp it on `response`"""
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request, tag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
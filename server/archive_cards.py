@@ -0,0 +1,26 @@
+"""
+Move cards archived for longer than ARCHIVE_MOVE_AFTER_DAYS out of the live
+tables and into card_archives (see app/archive.py). The API does this every
+ARCHIVE_MOVE_INTERVAL seconds; run this instead from cron with the interval
+set to 0, or to move a backlog now:
+
+    python archive_cards.py
+"""
+import asyncio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import archive
+from app.database import async_engine
+
+async def archive_cards():
+    print("Moving archived cards...")
+    try:
+        moved = await archive.move_all_archived()
+    finally:
+        await async_engine.dispose()
+    print(f"Moved {moved} cards to the archive")
+
+if __name__ == "__main__":
+    asyncio.run(archive_cards())
@@ -0,0 +1,97 @@
+"""
+Convert the ids already stored to the storage ID_SCHEME asks for.
+
+ID_SCHEME=uuid7 stores ids as native UUIDs (PostgreSQL) or 16-byte BLOBs
+(SQLite), where uuid4 and every existing database keep them as strings. Run
+this once after changing ID_SCHEME, with the API stopped:
+
+    ID_SCHEME=uuid7 python convert_ids.py   # strings -> compact
+    ID_SCHEME=uuid4 python convert_ids.py   # compact -> strings
+
+Existing ids keep their values, only their storage changes; ids generated from
+then on follow the scheme. Running it again is a no-op.
+"""
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import inspect, text
+
+from app.database import engine
+from app.ids import ID, ID_SCHEME
+from app import models
+
+def id_columns():
+    """{table: [column, ...]} for every column holding an id"""
+    columns = {}
+    for table in models.Base.metadata.sorted_tables:
+        for column in table.columns:
+            if column.type is ID:
+                columns.setdefault(table.name, []).append(column.name)
+    # Maintained outside the ORM metadata, see app/search_index.py
+    if inspect(engine).has_table("search_documents"):
+        columns["search_documents"] = ["entity_id", "card_id"]
+    return columns
+
+def _to_bytes(value):
+    return uuid.UUID(value).bytes if isinstance(value, str) else value
+
+def _to_string(value):
+    return str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else value
+
+def convert_sqlite(compact: bool):
+    # SQLite columns take any value, so only the stored values change
+    stored, function = ("text", _to_bytes) if compact else ("blob", _to_string)
+    columns = id_columns()
+    with engine.begin() as conn:
+        conn.connection.driver_connection.create_function("convert_id", 1, function, deterministic=True)
+        for table, names in columns.items():
+            for column in names:
+                result = conn.execute(text(
+                    f'UPDATE "{table}" SET "{column}" = convert_id("{column}") WHERE typeof("{column}") = :stored'
+                ), {"stored": stored})
+                print(f"{table}.{column}: {result.rowcount} converted")
+
+def convert_postgresql(compact: bool):
+    target = "uuid" if compact else "varchar"
+    columns = id_columns()
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        # A key and its foreign keys must change type together, so the
+        # constraints come off for the duration
+        foreign_keys = [
+            (table, fk) for table in columns for fk in inspector.get_foreign_keys(table)
+            if fk["referred_table"] in columns
+        ]
+        for table, fk in foreign_keys:
+            conn.execute(text(f'ALTER TABLE "{table}" DROP CONSTRAINT "{fk["name"]}"'))
+        for table, names in columns.items():
+            current = {column["name"]: column["type"] for column in inspector.get_columns(table)}
+            for column in names:
+                if (current[column].__visit_name__.upper() == "UUID") == compact:
+                    continue
+                conn.execute(text(
+                    f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE {target} USING "{column}"::{target}'
+                ))
+                print(f"{table}.{column}: {target}")
+        for table, fk in foreign_keys:
+            ondelete = fk.get("options", {}).get("ondelete")
+            conn.execute(text(
+                f'ALTER TABLE "{table}" ADD CONSTRAINT "{fk["name"]}" '
+                f'FOREIGN KEY ({", ".join(fk["constrained_columns"])}) '
+                f'REFERENCES "{fk["referred_table"]}" ({", ".join(fk["referred_columns"])})'
+                + (f" ON DELETE {ondelete}" if ondelete else "")
+            ))
+
+def convert_ids():
+    compact = ID_SCHEME == "uuid7"
+    print(f"Converting ids to {'compact UUIDs' if compact else 'strings'} ({ID_SCHEME})...")
+    if engine.dialect.name == "postgresql":
+        convert_postgresql(compact)
+    else:
+        convert_sqlite(compact)
+    print("Done!")
+
+if __name__ == "__main__":
+    convert_ids()
@@ -7,15 +7,30 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from alembic import command
+from alembic.config import Config
+
 from app.database import Base, engine
+from app.search_index import search_index
 
 # Import all models to ensure they're registered
 from app import models
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def stamp_migrations():
+    """Mark the freshly created schema as up to date with alembic"""
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    command.stamp(config, "head")
+
 def init_database():
     """Create all tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        search_index.ensure_schema(conn)
+    stamp_migrations()
     print("Database tables created successfully!")
     print("\nNext steps:")
     print("1. Run: python seed.py")
@@ -1,8 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import sys
 import os
+import asyncio
+import json
 from dotenv import load_dotenv
 
 # Add current directory to Python path for Render
@@ -10,9 +12,55 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 load_dotenv()
 
-from app.routers import boards, lists, cards, labels, users, search
+from app.routers import boards, lists, cards, labels, users, search, batch
+from app.pagination import NEXT_CURSOR_HEADER
+from app.database import READ_PRIMARY_HEADER
+from app import storage
+from app.static_files import UploadFiles
+from app.compression import CompressionMiddleware
+from app.responses import APIResponse
 
-app = FastAPI(title="Trello Clone API", version="1.0.0")
+app = FastAPI(title="Trello Clone API", version="1.0.0", default_response_class=APIResponse)
+
+@app.on_event("startup")
+async def prepare_search_index():
+    from app.database import async_engine
+    from app.search_index import search_index
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(search_index.ensure_schema)
+
+_replica_monitor = None
+
+@app.on_event("startup")
+async def monitor_replicas():
+    from app.database import replicas
+
+    global _replica_monitor
+    if replicas.engines:
+        await replicas.check()
+        _replica_monitor = asyncio.create_task(replicas.monitor())
+
+_archive_mover = None
+
+@app.on_event("startup")
+async def move_archived_cards():
+    from app import archive
+
+    global _archive_mover
+    if archive.ARCHIVE_MOVE_INTERVAL > 0:
+        _archive_mover = asyncio.create_task(archive.run_mover())
+
+@app.on_event("shutdown")
+async def close_database():
+    from app.database import async_engine, read_engine, replicas
+
+    for task in (_replica_monitor, _archive_mover):
+        if task is not None:
+            task.cancel()
+    await async_engine.dispose()
+    await read_engine.dispose()
+    await replicas.dispose()
 
 # CORS middleware
 app.add_middleware(
@@ -21,12 +69,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", READ_PRIMARY_HEADER],
 )
 
-# Serve uploaded files
-uploads_dir = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(uploads_dir, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+# Outermost, so CORS headers and everything else pass through it
+app.add_middleware(CompressionMiddleware)
+
+# Serve uploaded files (attachments in an S3 bucket link to it directly)
+os.makedirs(storage.UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", UploadFiles(storage.UPLOAD_DIR), name="uploads")
 
 # Include routers
 app.include_router(boards.router, prefix="/api/boards", tags=["boards"])
@@ -35,6 +86,7 @@ app.include_router(cards.router, prefix="/api/cards", tags=["cards"])
 app.include_router(labels.router, prefix="/api/labels", tags=["labels"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
 
 @app.get("/")
 async def root():
@@ -44,19 +96,95 @@ async def root():
 async def health_check():
     return {"status": "ok", "message": "Server is running"}
 
+async def _board_exists(board_id: str) -> bool:
+    from sqlalchemy import select
+    from app.database import ReadSessionLocal
+    from app import models
+
+    async with ReadSessionLocal() as db:
+        return await db.scalar(select(models.Board.id).where(models.Board.id == board_id)) is not None
+
+# Seconds between SSE keep-alive comments, so proxies don't drop idle streams
+EVENT_HEARTBEAT = 15
+
+@app.websocket("/api/boards/{board_id}/events")
+async def board_events_socket(websocket: WebSocket, board_id: str):
+    from app.events import broker
+
+    if not await _board_exists(board_id):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    async with broker.subscribe(board_id) as events:
+        async def forward():
+            async for event in events:
+                await websocket.send_json(event)
+
+        forwarder = asyncio.create_task(forward())
+        try:
+            # Nothing is expected from the client; this just notices it leaving
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            forwarder.cancel()
+
+@app.get("/api/boards/{board_id}/events")
+async def board_events_stream(board_id: str):
+    """Server-sent events fallback for clients that can't open a WebSocket"""
+    from app.events import broker
+
+    if not await _board_exists(board_id):
+        raise HTTPException(status_code=404, detail="Board not found")
+
+    async def stream():
+        async with broker.subscribe(board_id) as events:
+            # Pump through a queue so a heartbeat timeout can't cancel the subscription
+            queue = asyncio.Queue(1)
+
+            async def forward():
+                async for event in events:
+                    await queue.put(event)
+
+            forwarder = asyncio.create_task(forward())
+            try:
+                yield ": connected\n\n"
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), EVENT_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    # No "event:" field, so EventSource.onmessage sees every type
+                    yield f"id: {event.get('version', '')}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                forwarder.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/seed")
 async def seed_database():
     try:
-        from app.database import SessionLocal, engine, Base
+        from sqlalchemy import select
+        from app.database import AsyncSessionLocal, async_engine, Base
+        from app.search_index import search_index
         from app import models
         
         # Create tables
-        Base.metadata.create_all(bind=engine)
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(search_index.ensure_schema)
         
         # Use session context manager
-        with SessionLocal() as db:
+        async with AsyncSessionLocal() as db:
             # Check if data already exists
-            existing_board = db.query(models.Board).first()
+            existing_board = await db.scalar(select(models.Board).limit(1))
             if existing_board:
                 return {"message": "Database already seeded"}
             
@@ -67,8 +195,7 @@ async def seed_database():
                 background="#0079bf"
             )
             db.add(board)
-            db.commit()
-            db.refresh(board)
+            await db.commit()
             
             # Create sample lists
             lists_data = [
@@ -81,7 +208,7 @@ async def seed_database():
                 list_item = models.List(**list_data, board_id=board.id)
                 db.add(list_item)
             
-            db.commit()
+            await db.commit()
             
             return {"message": "Database seeded successfully", "board_id": board.id}
         
@@ -0,0 +1,24 @@
+"""
+Rebuild every card's badge counters from its comments, attachments and
+checklist items.
+
+The API keeps the counters current on every write (see app/badges.py); run
+this to repair them if rows were changed some other way:
+
+    python recount_badges.py
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.badges import recount
+from app.database import engine
+
+def recount_badges():
+    print("Recounting card badges...")
+    with engine.begin() as conn:
+        result = conn.execute(recount())
+    print(f"Recounted {result.rowcount} cards")
+
+if __name__ == "__main__":
+    recount_badges()
@@ -9,7 +9,8 @@ sys.path.insert(0, os.path.dirname(__file__))
 load_dotenv()
 
 from app.database import SessionLocal, engine, Base
-from app import models
+from app.search_index import search_index
+from app import badges, models
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -292,6 +293,13 @@ def seed_database():
                 db.add(comment)
     
     db.commit()
+
+    # Seeded rows bypass the API, so index and count them in one pass
+    with engine.begin() as conn:
+        search_index.create_schema(conn)
+        search_index.rebuild(conn)
+        conn.execute(badges.recount())
+
     print("Database seeded successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+"""
+Shared fixtures. The app reads its configuration at import, so the test
+database and storage are set up here before anything from it is imported.
+"""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="trello-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+# Cached boards would hide what a request really costs
+os.environ["BOARD_CACHE_URL"] = "off"
+os.environ["ARCHIVE_MOVE_INTERVAL"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+from app.database import Base, SessionLocal, engine
+from app import models
+
+@pytest.fixture(scope="session")
+def client():
+    Base.metadata.create_all(bind=engine)
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def user_id(client):
+    with SessionLocal() as db:
+        user = models.User(name="Test User", email="test@example.com")
+        db.add(user)
+        db.commit()
+        return user.id
+
+@pytest.fixture
+def make_board(client, user_id):
+    """make_board(lists, cards_per_list) -> board id, each card with a label, member, checklist item and comment"""
+    def make(lists: int, cards_per_list: int) -> str:
+        board = client.post("/api/boards/", json={"title": "Board"}).json()
+        label = client.post("/api/labels/", json={"name": "bug", "color": "red", "boardId": board["id"]}).json()
+        for list_index in range(lists):
+            card_list = client.post("/api/lists/", json={"title": f"List {list_index}", "boardId": board["id"]}).json()
+            for card_index in range(cards_per_list):
+                card = client.post("/api/cards/", json={"title": f"bug {card_index}", "listId": card_list["id"]}).json()
+                client.post(f"/api/cards/{card['id']}/labels", json={"labelId": label["id"]})
+                client.post(f"/api/cards/{card['id']}/members", json={"userId": user_id})
+                checklist = client.post(f"/api/cards/{card['id']}/checklists", json={"title": "Steps"}).json()
+                client.post(f"/api/cards/checklists/{checklist['id']}/items", json={"text": "step"})
+                client.post(f"/api/cards/{card['id']}/comments", json={"text": "bug", "userId": user_id})
+        return board["id"]
+    return make
@@ -0,0 +1,47 @@
+"""
+Count the SQL statements an engine runs, to pin the query budget of an endpoint.
+
+    with count_queries() as queries:
+        client.get("/api/search/cards?q=bug")
+    assert queries.count <= 10, queries.statements
+
+`assert_max_queries(n)` does the same and raises with the offending SQL.
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.database import async_engine, read_engine
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries(engine=None):
+    """Counts on both the write and read engines unless given one"""
+    counter = QueryCounter()
+    engines = [engine] if engine is not None else {async_engine, read_engine}
+    # Async engines fire cursor events on their sync counterpart
+    targets = [getattr(each, "sync_engine", each) for each in engines]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", counter)
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None):
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"Expected at most {limit} queries, ran {counter.count}:\n" + "\n".join(counter.statements)
+        )
@@ -0,0 +1,39 @@
+"""Archiving and restoring cards that are still in the live tables"""
+
+def _card(client):
+    board = client.post("/api/boards/", json={"title": "Board"}).json()
+    first = client.post("/api/lists/", json={"title": "First", "boardId": board["id"]}).json()
+    second = client.post("/api/lists/", json={"title": "Second", "boardId": board["id"]}).json()
+    client.post("/api/cards/", json={"title": "Existing", "listId": second["id"]})
+    card = client.post("/api/cards/", json={"title": "Card", "listId": first["id"]}).json()
+    return board, first, second, card
+
+def test_archive_hides_card_and_returns_timestamp(client):
+    board, first, _, card = _card(client)
+
+    archived = client.post(f"/api/cards/{card['id']}/archive")
+    assert archived.status_code == 200, archived.text
+    assert archived.json()["archivedAt"] is not None
+
+    board_cards = client.get(f"/api/boards/{board['id']}").json()["lists"][0]["cards"]
+    assert card["id"] not in [each["id"] for each in board_cards]
+    listing = client.get(f"/api/boards/{board['id']}/archive").json()
+    assert [each["id"] for each in listing] == [card["id"]]
+
+def test_restore_to_another_list_appends(client):
+    board, _, second, card = _card(client)
+    client.post(f"/api/cards/{card['id']}/archive")
+
+    restored = client.post(f"/api/cards/{card['id']}/restore", json={"listId": second["id"]})
+    assert restored.status_code == 200, restored.text
+    body = restored.json()
+    assert body["archivedAt"] is None
+    assert body["listId"] == second["id"]
+
+    cards = client.get(f"/api/cards/list/{second['id']}").json()
+    assert [each["title"] for each in cards] == ["Existing", "Card"]
+    assert body["position"] == cards[-1]["position"]
+
+def test_restore_rejects_live_card(client):
+    _, _, _, card = _card(client)
+    assert client.post(f"/api/cards/{card['id']}/restore").status_code == 400
@@ -0,0 +1,49 @@
+"""Attachment uploads through the route: stored once, and cleaned up on failure"""
+import os
+import time
+import pytest
+from app import models, storage, thumbnails
+from app.database import SessionLocal
+
+@pytest.fixture
+def blob_store(tmp_path, monkeypatch):
+    store = storage.LocalBlobStore(str(tmp_path))
+    monkeypatch.setattr(storage, "blob_store", store)
+    return store
+
+@pytest.fixture
+def card_id(client):
+    board = client.post("/api/boards/", json={"title": "Board"}).json()
+    card_list = client.post("/api/lists/", json={"title": "List", "boardId": board["id"]}).json()
+    return client.post("/api/cards/", json={"title": "Card", "listId": card_list["id"]}).json()["id"]
+
+def _upload(client, card_id, data: bytes):
+    return client.post(f"/api/cards/{card_id}/attachments", files={"file": ("notes.txt", data, "text/plain")})
+
+def _stored_files(root):
+    return [name for _, _, names in os.walk(root) for name in names]
+
+def test_upload_stores_file_and_row(client, blob_store, card_id):
+    response = _upload(client, card_id, b"attachment body")
+    assert response.status_code == 201, response.text
+    key = response.json()["url"].removeprefix("/uploads/")
+    assert os.path.exists(blob_store.path(key))
+    with SessionLocal() as db:
+        assert db.get(models.Blob, key) is not None
+
+def test_failed_upload_abandons_stored_file(client, blob_store, card_id, monkeypatch):
+    async def fail(db, key):
+        raise RuntimeError("database went away")
+    monkeypatch.setattr(thumbnails, "existing", fail)
+
+    with pytest.raises(RuntimeError):
+        _upload(client, card_id, b"never referenced")
+
+    # Collected after the abandoning transaction commits
+    for _ in range(50):
+        if not _stored_files(blob_store.root):
+            break
+        time.sleep(0.02)
+    assert _stored_files(blob_store.root) == []
+    with SessionLocal() as db:
+        assert db.query(models.Attachment).filter_by(card_id=card_id).count() == 0
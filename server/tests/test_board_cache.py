@@ -0,0 +1,39 @@
+"""The in-memory board cache stays within its byte budget"""
+import asyncio
+from app.board_cache import MemoryBoardCache
+
+def test_evicts_least_recently_used_by_size():
+    async def scenario():
+        cache = MemoryBoardCache(max_bytes=100)
+        await cache.put("a", 1, b"x" * 40)
+        await cache.put("b", 1, b"x" * 40)
+        assert await cache.get("a", 1) is not None
+        await cache.put("c", 1, b"x" * 40)
+        assert cache.size == 80
+        assert await cache.get("b", 1) is None
+        assert await cache.get("a", 1) is not None
+        assert await cache.get("c", 1) is not None
+    asyncio.run(scenario())
+
+def test_oversized_body_is_not_cached():
+    async def scenario():
+        cache = MemoryBoardCache(max_bytes=100)
+        await cache.put("a", 1, b"x" * 50)
+        await cache.put("big", 1, b"x" * 101)
+        assert await cache.get("big", 1) is None
+        assert await cache.get("a", 1) is not None
+        assert cache.size == 50
+    asyncio.run(scenario())
+
+def test_replacing_and_invalidating_release_size():
+    async def scenario():
+        cache = MemoryBoardCache(max_bytes=100)
+        await cache.put("a", 1, b"x" * 60)
+        await cache.put("a", 2, b"x" * 30)
+        assert cache.size == 30
+        assert await cache.get("a", 1) is None
+        assert cache.size == 0
+        await cache.put("b", 1, b"x" * 30)
+        await cache.invalidate(["b"])
+        assert cache.size == 0
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+"""
+Query budgets for the read endpoints that used to issue one query per row.
+
+Each endpoint must run the same number of statements for a board of one card
+as for a board of sixty, and stay within its budget.
+"""
+import pytest
+from query_count import assert_max_queries, count_queries
+
+def _count(client, url: str) -> int:
+    with count_queries() as queries:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    return queries.count
+
+ENDPOINTS = {
+    # path, budget
+    "search_cards": ("/api/search/cards?q=bug&board_id={board}&limit=200", 6),
+    "get_lists": ("/api/lists/board/{board}", 4),
+    "get_board": ("/api/boards/{board}", 6),
+}
+
+@pytest.mark.parametrize("name", ENDPOINTS)
+def test_query_count_does_not_grow_with_board(client, make_board, name):
+    path, budget = ENDPOINTS[name]
+    small, large = make_board(1, 1), make_board(3, 20)
+
+    small_count = _count(client, path.format(board=small))
+    with assert_max_queries(budget):
+        response = client.get(path.format(board=large))
+    assert response.status_code == 200, response.text
+
+    assert _count(client, path.format(board=large)) == small_count
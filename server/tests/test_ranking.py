@@ -0,0 +1,31 @@
+"""Renumbering positions is a board write like any other"""
+from app import ranking
+
+def _version(client, board_id):
+    return int(client.get(f"/api/boards/{board_id}").headers["etag"].strip('"').rsplit("-", 1)[1])
+
+def test_rebalance_bumps_version_and_logs_every_card(client):
+    board = client.post("/api/boards/", json={"title": "Board"}).json()
+    card_list = client.post("/api/lists/", json={"title": "List", "boardId": board["id"]}).json()
+    ids = [
+        client.post("/api/cards/", json={"title": f"Card {index}", "listId": card_list["id"]}).json()["id"]
+        for index in range(4)
+    ]
+
+    # Keep moving the last card to index 1 until the gap there runs out
+    for _ in range(100):
+        cards = client.get(f"/api/cards/list/{card_list['id']}").json()
+        before = _version(client, board["id"])
+        client.put(f"/api/cards/{cards[-1]['id']}/move", json={"listId": card_list["id"], "position": 1})
+        cards = client.get(f"/api/cards/list/{card_list['id']}").json()
+        if [card["position"] for card in cards] == [index * ranking.POSITION_STEP for index in range(4)]:
+            break
+    else:
+        raise AssertionError("positions were never renumbered")
+
+    delta = client.get(f"/api/boards/{board['id']}/changes", params={"since": before}).json()
+    assert {card["id"] for card in delta["cards"]} == set(ids)
+    assert sorted(card["position"] for card in delta["cards"]) == [card["position"] for card in cards]
+
+    served = client.get(f"/api/boards/{board['id']}").json()["lists"][0]["cards"]
+    assert [card["position"] for card in served] == [card["position"] for card in cards]
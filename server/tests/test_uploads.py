@@ -0,0 +1,98 @@
+"""Streaming multipart uploads: limits, broken bodies and missing parts"""
+import hashlib
+import os
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app import uploads
+
+BOUNDARY = "test-boundary"
+MAX_BYTES = 1000
+
+def _part(name: str, data: bytes, filename=None, content_type="text/plain") -> bytes:
+    disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+    headers = f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+    if filename:
+        headers += f"Content-Type: {content_type}\r\n"
+    return headers.encode() + b"\r\n" + data + b"\r\n"
+
+def _body(*parts: bytes) -> bytes:
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+@pytest.fixture
+def upload(tmp_path):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def receive(request: Request):
+        received = await uploads.receive_file(
+            request, str(tmp_path), allowed_types={"text/plain"}, max_bytes=MAX_BYTES,
+        )
+        with open(received.temp_path, "rb") as file:
+            content = file.read()
+        await received.discard()
+        return {
+            "filename": received.filename, "size": received.size, "sha256": received.sha256,
+            "matches": hashlib.sha256(content).hexdigest() == received.sha256,
+        }
+
+    client = TestClient(app)
+
+    def post(body: bytes):
+        return client.post("/upload", content=body, headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"})
+    return post
+
+def _leftovers(tmp_path):
+    return os.listdir(tmp_path)
+
+def test_receives_file_with_hash(upload, tmp_path):
+    data = b"hello " * 100
+    response = upload(_body(_part("note", b"ignored"), _part("file", data, filename="hello.txt")))
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "filename": "hello.txt", "size": len(data), "sha256": hashlib.sha256(data).hexdigest(), "matches": True,
+    }
+    assert _leftovers(tmp_path) == []
+
+def test_oversized_upload_is_refused_while_streaming(upload, tmp_path):
+    # Under the declared-length check, so the streaming count has to catch it
+    response = upload(_body(_part("file", b"x" * (MAX_BYTES + 1), filename="big.txt")))
+    assert response.status_code == 413
+    assert _leftovers(tmp_path) == []
+
+def test_oversized_declared_length_is_refused_up_front(upload, tmp_path):
+    response = upload(_body(_part("file", b"x" * (MAX_BYTES + uploads.FORM_OVERHEAD + 1), filename="big.txt")))
+    assert response.status_code == 413
+    assert _leftovers(tmp_path) == []
+
+def test_truncated_body_leaves_nothing_behind(upload, tmp_path):
+    body = _body(_part("file", b"partial data", filename="cut.txt"))
+    response = upload(body[:body.index(b"partial") + 4])
+    assert response.status_code == 422
+    assert _leftovers(tmp_path) == []
+
+def test_missing_file_part(upload, tmp_path):
+    response = upload(_body(_part("note", b"no file here")))
+    assert response.status_code == 422
+    assert "'file'" in response.json()["detail"]
+    assert _leftovers(tmp_path) == []
+
+def test_file_under_another_field_name(upload, tmp_path):
+    response = upload(_body(_part("other", b"data", filename="a.txt")))
+    assert response.status_code == 422
+    assert _leftovers(tmp_path) == []
+
+def test_disallowed_type(upload, tmp_path):
+    response = upload(_body(_part("file", b"data", filename="a.exe", content_type="application/x-msdownload")))
+    assert response.status_code == 400
+    assert _leftovers(tmp_path) == []
+
+def test_not_multipart(tmp_path):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def receive(request: Request):
+        await uploads.receive_file(request, str(tmp_path))
+
+    response = TestClient(app).post("/upload", json={"file": "data"})
+    assert response.status_code == 400